@@ -5,17 +5,22 @@ from flask_jwt_extended import JWTManager
 from config import Config
 from dotenv import load_dotenv
 from flask_cors import CORS
+from app.replicas import RoutingSession
 load_dotenv()
 import cloudinary
 import os
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    if app.config["TRUSTED_PROXIES"]:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        proxies = app.config["TRUSTED_PROXIES"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
     CORS(
     app,
     origins=["http://localhost:5173"],
@@ -24,13 +29,43 @@ def create_app():
     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     )
 
+    from app.db_pool import engine_options, init_db_pool
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
+    from app.replicas import init_replicas
+    init_replicas(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_db_pool(app, db)
+    from app.search import include_object
+    migrate.init_app(app, db, include_object=include_object)
     jwt.init_app(app)
 
     from app.routes import bp as main_bp
     app.register_blueprint(main_bp)
 
+    from app.name_index import init_name_indexes
+    init_name_indexes()
+
+    from app.view_counter import init_view_counter
+    init_view_counter(app)
+
+    from app.unread_counts import init_unread_counts
+    init_unread_counts(app)
+
+    from app.passwords import init_passwords
+    init_passwords(app)
+
+    from app.etags import init_etags
+    init_etags(app)
+
+    from app.response_cache import init_response_cache
+    init_response_cache(app)
+
+    from app.sql_stats import init_sql_stats
+    init_sql_stats(app)
+
+    from app.query_plans import check_query_plans_command
+    app.cli.add_command(check_query_plans_command)
+
     return app
 
 from .models import *
@@ -0,0 +1,256 @@
+# app/conversations.py
+"""
+Maintenance of the `conversations` inbox read model.
+
+Every function here only stages changes on db.session, including the
+per-user unread totals (app/unread_counts.py). The calling route
+commits them together with the Message write, so the read model can never
+drift from a committed message. Counters change through SQL expressions
+(unread = unread + 1), so concurrent sends don't lose increments.
+
+history_page() reads a page of the message history for a pair, from
+anchors resolve_anchor() builds out of before=/after= values.
+"""
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from . import db, unread_counts
+from .pagination import encode_cursor, decode_cursor
+from .models import Conversation, Message, PinnedConversation
+
+
+def pair(user_id, other_user_id) -> tuple:
+    return tuple(sorted((int(user_id), int(other_user_id))))
+
+
+def side(user_id, other_user_id) -> str:
+    """'a' if user_id is the lower id of the pair, else 'b'."""
+    return "a" if int(user_id) <= int(other_user_id) else "b"
+
+
+def pair_filter(user_id, other_user_id):
+    a, b = pair(user_id, other_user_id)
+    return db.and_(Conversation.user_a_id == a, Conversation.user_b_id == b)
+
+
+def get_or_create(user_id, other_user_id) -> Conversation:
+    a, b = pair(user_id, other_user_id)
+    conv = Conversation.query.filter_by(user_a_id=a, user_b_id=b).first()
+    if conv:
+        return conv
+
+    pinned = {
+        (p.user_id, p.other_user_id)
+        for p in PinnedConversation.query.filter(
+            db.or_(
+                db.and_(PinnedConversation.user_id == a, PinnedConversation.other_user_id == b),
+                db.and_(PinnedConversation.user_id == b, PinnedConversation.other_user_id == a),
+            )
+        )
+    }
+    try:
+        with db.session.begin_nested():
+            conv = Conversation(
+                user_a_id=a, user_b_id=b, unread_a=0, unread_b=0,
+                pinned_a=(a, b) in pinned, pinned_b=(b, a) in pinned,
+            )
+            db.session.add(conv)
+        return conv
+    except IntegrityError:
+        # another request created the row first
+        return Conversation.query.filter_by(user_a_id=a, user_b_id=b).one()
+
+
+def _update(user_id, other_user_id, values: dict, *criteria):
+    return (
+        Conversation.query.filter(pair_filter(user_id, other_user_id), *criteria)
+        .update(values, synchronize_session=False)
+    )
+
+
+def _set_last(user_id, other_user_id, msg):
+    values = {
+        Conversation.last_message_id: msg.message_id if msg else None,
+        Conversation.last_sender_id: msg.sender_id if msg else None,
+        Conversation.last_message_text: msg.text if msg else None,
+        Conversation.last_message_at: msg.sent_at if msg else None,
+    }
+    _update(user_id, other_user_id, values)
+
+
+def record_message(msg: Message):
+    """New message (already flushed): bump the recipient's unread and advance last_message."""
+    get_or_create(msg.sender_id, msg.recipient_id)
+    unread = getattr(Conversation, f"unread_{side(msg.recipient_id, msg.sender_id)}")
+    _update(msg.sender_id, msg.recipient_id, {unread: unread + 1})
+    unread_counts.adjust(msg.recipient_id, 1)
+    # only move forward, in case a concurrent send already recorded a newer message
+    _update(
+        msg.sender_id, msg.recipient_id,
+        {
+            Conversation.last_message_id: msg.message_id,
+            Conversation.last_sender_id: msg.sender_id,
+            Conversation.last_message_text: msg.text,
+            Conversation.last_message_at: msg.sent_at,
+        },
+        db.or_(Conversation.last_message_id.is_(None), Conversation.last_message_id < msg.message_id),
+    )
+
+
+def mark_read(reader_id, other_user_id):
+    """
+    Mark everything other_user_id has sent reader_id as read, set-based.
+
+    The watermark is the newest message_id from the other user at this
+    moment. One UPDATE flips `read` up to it, the reader's last_read_id
+    moves up to it, and the unread counter becomes a range count
+    (message_id > watermark). A message racing in mid-call stays unread.
+    Returns (watermark, rows_updated); watermark is None if nothing was
+    ever sent.
+    """
+    reader_id, other_user_id = int(reader_id), int(other_user_id)
+    from_other = db.and_(Message.sender_id == other_user_id, Message.recipient_id == reader_id)
+
+    watermark = db.session.query(db.func.max(Message.message_id)).filter(from_other).scalar()
+    if watermark is None:
+        return None, 0
+
+    updated = (
+        Message.query.filter(from_other, Message.read == db.false(), Message.message_id <= watermark)
+        .update({Message.read: True}, synchronize_session=False)
+    )
+
+    reader_side = side(reader_id, other_user_id)
+    last_read = getattr(Conversation, f"last_read_id_{reader_side}")
+    unread = getattr(Conversation, f"unread_{reader_side}")
+    remaining = (
+        db.select(db.func.count(Message.message_id))
+        .where(from_other, Message.message_id > watermark)
+        .scalar_subquery()
+    )
+    _update(reader_id, other_user_id, {
+        last_read: db.case((db.func.coalesce(last_read, 0) < watermark, watermark), else_=last_read),
+        unread: remaining,
+    })
+    unread_counts.adjust(reader_id, -updated)
+    return watermark, updated
+
+
+def record_delete(msg: Message):
+    """Message deleted (and flushed): fix the unread counter and repoint last_message if needed."""
+    if not msg.read:
+        unread = getattr(Conversation, f"unread_{side(msg.recipient_id, msg.sender_id)}")
+        _update(msg.sender_id, msg.recipient_id, {unread: db.case((unread > 0, unread - 1), else_=0)})
+        unread_counts.adjust(msg.recipient_id, -1)
+
+    conv = Conversation.query.filter(pair_filter(msg.sender_id, msg.recipient_id)).first()
+    if conv and conv.last_message_id == msg.message_id:
+        latest = Message.query.filter(
+            db.or_(
+                db.and_(Message.sender_id == msg.sender_id, Message.recipient_id == msg.recipient_id),
+                db.and_(Message.sender_id == msg.recipient_id, Message.recipient_id == msg.sender_id),
+            )
+        ).order_by(Message.message_id.desc()).first()
+        _set_last(msg.sender_id, msg.recipient_id, latest)
+
+
+def record_edit(msg: Message):
+    _update(
+        msg.sender_id, msg.recipient_id,
+        {Conversation.last_message_text: msg.text},
+        Conversation.last_message_id == msg.message_id,
+    )
+
+
+def set_pinned(user_id, other_user_id, pinned: bool):
+    flag = getattr(Conversation, f"pinned_{side(user_id, other_user_id)}")
+    _update(user_id, other_user_id, {flag: pinned})
+
+
+# -----------------------------------------------------------------------------
+# History pages
+# -----------------------------------------------------------------------------
+def _sort_key(m):
+    return (m.sent_at or datetime.min, m.message_id)
+
+
+def history_cursor(msg: Message) -> str:
+    """Opaque before=/after= value for `msg`; self-contained, so it outlives the message."""
+    return encode_cursor(msg.sent_at.isoformat(), msg.message_id)
+
+
+def resolve_anchor(user_id, other_user_id, value: str):
+    """
+    The (sent_at, message_id) position a before=/after= value points at, or
+    None if it is malformed or names another conversation's message.
+
+    Takes a history_cursor() or a bare message id. A bare id is looked up;
+    if that message has since been deleted, sent_at is None and the page is
+    cut by id alone (ids are assigned in send order).
+    """
+    if value.isdigit():
+        anchor = db.session.get(Message, int(value))
+        if anchor is None:
+            return None, int(value)
+        if {anchor.sender_id, anchor.recipient_id} != {int(user_id), int(other_user_id)}:
+            return None
+        return anchor.sent_at, anchor.message_id
+    values = decode_cursor(value)
+    try:
+        sent_at, message_id = values
+        return datetime.fromisoformat(sent_at), int(message_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def history_page(user_id, other_user_id, limit: int, before=None, after=None):
+    """
+    One page of the messages between two users, oldest first.
+
+    - before=(sent_at, message_id): the `limit` messages just older than it
+    - after=(sent_at, message_id): the `limit` messages just newer than it (delta since X)
+    - neither: the newest `limit` messages
+
+    Anchors come from resolve_anchor(). Each direction is read separately,
+    with ORDER BY sent_at + LIMIT, so both are bounded scans on
+    ix_messages_sender_id_recipient_id_sent_at. The two short lists are then
+    merged. Returns (messages, has_more).
+    """
+    user_id, other_user_id = int(user_id), int(other_user_id)
+    anchor = before if before is not None else after
+    cond = None
+    if anchor is not None:
+        sent_at, message_id = anchor
+        if sent_at is None:
+            cond = Message.message_id < message_id if before is not None else Message.message_id > message_id
+        elif before is not None:
+            cond = db.or_(
+                Message.sent_at < sent_at,
+                db.and_(Message.sent_at == sent_at, Message.message_id < message_id),
+            )
+        else:
+            cond = db.or_(
+                Message.sent_at > sent_at,
+                db.and_(Message.sent_at == sent_at, Message.message_id > message_id),
+            )
+
+    newest_first = after is None
+    order = (
+        [Message.sent_at.desc(), Message.message_id.desc()] if newest_first
+        else [Message.sent_at.asc(), Message.message_id.asc()]
+    )
+    directions = {(user_id, other_user_id), (other_user_id, user_id)}
+    rows = []
+    for sender, recipient in directions:
+        q = Message.query.filter(Message.sender_id == sender, Message.recipient_id == recipient)
+        if cond is not None:
+            q = q.filter(cond)
+        rows += q.order_by(*order).limit(limit + 1).all()
+
+    rows.sort(key=_sort_key, reverse=newest_first)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if newest_first:
+        rows.reverse()
+    return rows, has_more
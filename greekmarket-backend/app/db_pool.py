@@ -0,0 +1,158 @@
+# app/db_pool.py
+"""
+Engine/pool configuration and pool metrics.
+
+engine_options() turns the DB_* values on Config into
+SQLALCHEMY_ENGINE_OPTIONS: pool size, overflow, checkout timeout,
+pre-ping, recycle, LIFO reuse, and a server-side statement timeout.
+Server (Postgres) URLs get an InstrumentedQueuePool. It times every
+checkout, so pool waits show up in the per-request SQL stats and in
+snapshot().
+
+DB_PGBOUNCER=1 is for PgBouncer in transaction-pooling mode, where
+consecutive transactions may run on different server connections:
+  - no session state: the statement timeout is applied with SET LOCAL in
+    each transaction, not as a startup option PgBouncer would reject
+  - no server-side prepared statements (psycopg 3's prepare_threshold is
+    turned off; psycopg2 never prepares, so nothing changes there)
+
+snapshot() reports, per engine: pool capacity and saturation, connections
+opened (a spike after deploys or worker recycling is a connection storm),
+checkout timeouts, and checkout wait percentiles over the recent window.
+GET /internal/metrics/db-pool serves it.
+"""
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+from . import sql_stats
+
+WAIT_WINDOW = 1000  # recent checkouts kept for the wait percentiles
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.waits = deque(maxlen=WAIT_WINDOW)  # seconds
+
+    def observe_checkout(self, seconds: float, timed_out: bool):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.waits.append(seconds)
+
+    def observe_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            waits = sorted(self.waits)
+            counts = {"checkouts": self.checkouts, "timeouts": self.timeouts, "connects": self.connects}
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2) if waits else 0.0
+
+        return {**counts, "wait_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99), "max": pct(1.0)}}
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics  # keep counting across engine.dispose()
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = True
+        try:
+            conn = super()._do_get()
+            timed_out = False
+            return conn
+        finally:
+            waited = time.perf_counter() - started
+            self.metrics.observe_checkout(waited, timed_out)
+            sql_stats.record_pool_wait(waited)
+
+
+def engine_options(config) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings."""
+    uri = config.get("SQLALCHEMY_DATABASE_URI") or ""
+    options = {"pool_pre_ping": config["DB_POOL_PRE_PING"]}
+    if uri.startswith("sqlite"):
+        return options  # SQLite's pools don't take sizing options
+
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=config["DB_POOL_SIZE"],
+        max_overflow=config["DB_MAX_OVERFLOW"],
+        pool_timeout=config["DB_POOL_TIMEOUT"],
+        pool_recycle=config["DB_POOL_RECYCLE"],
+        pool_use_lifo=config["DB_POOL_USE_LIFO"],
+    )
+    connect_args = {}
+    if config["DB_PGBOUNCER"]:
+        if uri.split("://", 1)[0] == "postgresql+psycopg":
+            connect_args["prepare_threshold"] = None
+    elif config["DB_STATEMENT_TIMEOUT_MS"]:
+        connect_args["options"] = f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+def snapshot(engines) -> dict:
+    """Pool gauges and counters for each engine, keyed by bind name ("default" for the primary)."""
+    out = {}
+    for name, engine in engines.items():
+        pool = engine.pool
+        entry = {"pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            checked_out = pool.checkedout()
+            entry.update(
+                size=pool.size(),
+                checked_out=checked_out,
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                capacity=capacity,
+                saturation=round(checked_out / capacity, 3) if capacity else 0.0,
+            )
+        if isinstance(pool, InstrumentedQueuePool):
+            entry.update(pool.metrics.summary())
+        out[name or "default"] = entry
+    return out
+
+
+def init_db_pool(app, db):
+    """Attach connect counting and the PgBouncer statement timeout to the app's engines."""
+    timeout = app.config["DB_STATEMENT_TIMEOUT_MS"]
+    with app.app_context():
+        engines = db.engines
+        for engine in engines.values():
+            if not isinstance(engine.pool, InstrumentedQueuePool):
+                continue
+
+            def count_connect(dbapi_conn, record, pool=engine.pool):
+                pool.metrics.observe_connect()
+
+            event.listen(engine, "connect", count_connect)
+            if app.config["DB_PGBOUNCER"] and timeout:
+                def set_statement_timeout(conn, ms=int(timeout)):
+                    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {ms}")
+
+                event.listen(engine, "begin", set_statement_timeout)
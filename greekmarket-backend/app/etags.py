@@ -0,0 +1,71 @@
+# app/etags.py
+"""
+Version-based ETags and conditional GETs.
+
+A view builds its ETag from cheap version data: an entity's updated_at, or
+the ids and updated_at of the rows a page shows, taken from rows it has
+already loaded (a whole-table COUNT/MAX per request would cost more than
+it saves). The body is never hashed. Call not_modified() before
+serializing:
+
+    posts = q.limit(limit).all()
+    unchanged = not_modified(viewer_id, *page_version(posts))
+    if unchanged:
+        return unchanged            # 304: no image/author lookups, no JSON
+    ...build the full response...
+
+The after_request hook puts the ETag on the 200 response, along with
+`Cache-Control: private, no-cache`, so clients revalidate every time. Tags
+are weak (W/"..."). A change that doesn't touch any version column, such
+as an author renaming their handle or a post's view count going up, can
+keep the old tag.
+
+updated_at on schools, chapters and posts is bumped by the ORM on any
+column change. Routes that change what a page shows without touching the
+row (post images, chapter memberships) set the parent's updated_at
+themselves.
+"""
+import hashlib
+
+from flask import g, request, Response
+
+
+def version_tag(*parts) -> str:
+    """Opaque tag for a tuple of version values (timestamps, counts, ids)."""
+    raw = "|".join("" if p is None else (p.isoformat() if hasattr(p, "isoformat") else str(p)) for p in parts)
+    return hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+def matches(tag: str) -> bool:
+    return request.if_none_match.contains_weak(tag)
+
+
+def not_modified_response(tag: str) -> Response:
+    response = Response(status=304)
+    response.set_etag(tag, weak=True)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def not_modified(*parts):
+    """
+    Tag the current response with an ETag built from `parts`. Returns a 304
+    response if the client already holds that version, else None.
+    """
+    tag = version_tag(request.full_path, *parts)
+    g.etag = tag
+    if matches(tag):
+        return not_modified_response(tag)
+    return None
+
+
+def _add_etag(response):
+    tag = g.pop("etag", None)
+    if tag and response.status_code == 200 and not response.headers.get("ETag"):
+        response.set_etag(tag, weak=True)
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def init_etags(app):
+    app.after_request(_add_etag)
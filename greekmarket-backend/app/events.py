@@ -0,0 +1,159 @@
+# app/events.py
+"""
+Per-user realtime events (new messages, read receipts, unread totals) for
+the SSE stream.
+
+Routes call publish() after their commit. GET /events/stream subscribes the
+caller and relays events as Server-Sent Events, so clients don't have to
+poll the messages endpoints.
+
+Brokers:
+  - InProcessBroker (default): fan-out within one process; only reaches every
+    stream when the app runs as a single worker process.
+  - RedisBroker: set EVENT_BROKER_URL=redis://... to fan out across workers.
+    It speaks plain Redis pub/sub, so any Redis-protocol server works,
+    including a local stand-in. Needs the `redis` package.
+
+A stream holds its connection open, so run SSE behind a threaded or gevent
+worker class, not plain sync workers. Each worker admits at most
+SSE_MAX_STREAMS open streams (stream_slots); past that the route answers
+503 so a gthread worker keeps threads for regular requests. A stream ends
+with an `expired` event when the access token it was opened with expires;
+the client reconnects with a fresh token.
+"""
+import json
+import queue
+import threading
+
+from flask import current_app
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class InProcessSubscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def get(self, timeout: float):
+        """Next event dict, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker._remove(self)
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # user_id -> set of subscriptions
+
+    def publish(self, user_id: int, event: dict):
+        with self._lock:
+            subs = list(self._subscribers.get(int(user_id), ()))
+        for sub in subs:
+            try:
+                sub.queue.put_nowait(event)
+            except queue.Full:
+                pass  # slow consumer; the client resyncs from the REST endpoints on reconnect
+
+    def subscribe(self, user_id: int) -> InProcessSubscription:
+        sub = InProcessSubscription(self, int(user_id))
+        with self._lock:
+            self._subscribers.setdefault(sub.user_id, set()).add(sub)
+        return sub
+
+    def _remove(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+
+class RedisSubscription:
+    def __init__(self, client, channel):
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(channel)
+
+    def get(self, timeout: float):
+        message = self.pubsub.get_message(timeout=timeout)
+        if not message:
+            return None
+        return json.loads(message["data"])
+
+    def close(self):
+        self.pubsub.close()
+
+
+class RedisBroker:
+    def __init__(self, url: str):
+        import redis  # optional dependency, only needed for multi-worker fan-out
+
+        self.client = redis.Redis.from_url(url)
+
+    @staticmethod
+    def channel(user_id) -> str:
+        return f"events:user:{int(user_id)}"
+
+    def publish(self, user_id: int, event: dict):
+        self.client.publish(self.channel(user_id), json.dumps(event))
+
+    def subscribe(self, user_id: int) -> RedisSubscription:
+        return RedisSubscription(self.client, self.channel(user_id))
+
+
+class StreamSlots:
+    """Counts this process's open SSE streams against SSE_MAX_STREAMS."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+
+    def acquire(self, limit: int) -> bool:
+        with self._lock:
+            if self.open >= limit:
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open -= 1
+
+
+stream_slots = StreamSlots()
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                url = current_app.config.get("EVENT_BROKER_URL")
+                if url:
+                    _broker = RedisBroker(url)
+                else:
+                    current_app.logger.info("No EVENT_BROKER_URL: SSE events reach streams in this process only")
+                    _broker = InProcessBroker()
+    return _broker
+
+
+def publish(user_id, event_type: str, data: dict):
+    """Send an event to every open stream of `user_id`. Never raises into the caller."""
+    try:
+        get_broker().publish(user_id, {"type": event_type, "data": data})
+    except Exception:
+        current_app.logger.exception("Failed to publish %s event", event_type)
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
@@ -10,6 +10,9 @@ class School(db.Model):
     school_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
     domain = db.Column(db.String(255), unique=True, nullable=False)
+    # Bumped on every change; ETags on school pages derive from it (app/etags.py)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=db.text("CURRENT_TIMESTAMP"))
 
     users = db.relationship("User", backref="school", lazy=True)
     chapters = db.relationship("Chapter", backref="school", lazy=True)
@@ -41,6 +44,9 @@ class User(db.Model):
     handle = db.Column(db.String(50), unique=True, nullable=False)
     stripe_account_id = db.Column(db.String(128), nullable=True)
 
+    # Total unread messages, maintained by app/unread_counts.py
+    unread_message_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
 
 class Chapter(db.Model):
     __tablename__ = "chapters"
@@ -53,6 +59,9 @@ class Chapter(db.Model):
     profile_picture_url = db.Column(db.Text)
     created_by = db.Column(db.Integer, db.ForeignKey("users.user_id"))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on every change and when memberships change
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=db.text("CURRENT_TIMESTAMP"))
 
     memberships = db.relationship("UserChapterMembership", backref="chapter", lazy=True)
     posts = db.relationship("Post", backref="chapter", lazy=True)
@@ -134,6 +143,9 @@ class Post(db.Model):
     price = db.Column(db.Numeric(10, 2))
     views = db.Column(db.Integer, default=0, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on every edit (and image changes); view count flushes leave it alone
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=db.text("CURRENT_TIMESTAMP"))
 
     comments = db.relationship("Comment", backref="post", lazy=True)
     images = db.relationship("PostImage", backref="post", cascade="all, delete-orphan", lazy=True)
@@ -142,6 +154,12 @@ class Post(db.Model):
     is_sold = db.Column(db.Boolean, default=False)
     visibility = db.Column(db.String(20), nullable=False, default="public")
 
+    __table_args__ = (
+        db.Index("ix_posts_school_id_created_at", "school_id", "created_at"),
+        db.Index("ix_posts_chapter_id_created_at", "chapter_id", "created_at"),
+        db.Index("ix_posts_user_id_created_at", "user_id", "created_at"),
+    )
+
 
 class PostImage(db.Model):
     __tablename__ = "post_images"
@@ -150,6 +168,8 @@ class PostImage(db.Model):
     url = db.Column(db.Text, nullable=False)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.Index("ix_post_images_post_id", "post_id", "image_id"),)
+
 
 class Comment(db.Model):
     __tablename__ = "comments"
@@ -159,6 +179,8 @@ class Comment(db.Model):
     text = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.Index("ix_comments_post_id_created_at", "post_id", "created_at"),)
+
 
 class Favorite(db.Model):
     __tablename__ = "favorites"
@@ -166,6 +188,9 @@ class Favorite(db.Model):
     post_id = db.Column(db.Integer, db.ForeignKey("posts.post_id"), primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # the primary key leads with user_id; this serves lookups by post
+    __table_args__ = (db.Index("ix_favorites_post_id", "post_id"),)
+
 
 # --------------------------
 # Direct messages
@@ -187,6 +212,49 @@ class Message(db.Model):
     sender = db.relationship("User", foreign_keys=[sender_id], backref="sent_messages", lazy=True)
     recipient = db.relationship("User", foreign_keys=[recipient_id], backref="received_messages", lazy=True)
 
+    __table_args__ = (
+        db.Index("ix_messages_sender_id_recipient_id_sent_at", "sender_id", "recipient_id", "sent_at"),
+        # partial: only unread rows, so unread counts stay cheap as history grows
+        db.Index(
+            "ix_messages_recipient_id_unread", "recipient_id", "sender_id",
+            postgresql_where=db.text("read = false"),
+            sqlite_where=db.text("read = 0"),
+        ),
+    )
+
+
+class Conversation(db.Model):
+    """
+    Inbox read model: one row per user pair, with user_a_id < user_b_id.
+    Holds the last message, per-side unread counters, pin flags and read
+    watermarks.
+    Kept in step with Message writes by app/conversations.py, inside the
+    same transaction.
+    """
+    __tablename__ = "conversations"
+    conversation_id = db.Column(db.Integer, primary_key=True)
+
+    user_a_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
+    user_b_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
+
+    last_message_id = db.Column(db.Integer)  # no FK: the row is repointed when that message is deleted
+    last_sender_id = db.Column(db.Integer)
+    last_message_text = db.Column(db.Text)
+    last_message_at = db.Column(db.DateTime)
+
+    unread_a = db.Column(db.Integer, nullable=False, default=0)  # unread by user_a
+    unread_b = db.Column(db.Integer, nullable=False, default=0)
+    pinned_a = db.Column(db.Boolean, nullable=False, default=False)  # pinned by user_a
+    pinned_b = db.Column(db.Boolean, nullable=False, default=False)
+    last_read_id_a = db.Column(db.Integer)  # read watermark: newest message_id user_a has read
+    last_read_id_b = db.Column(db.Integer)
+
+    __table_args__ = (
+        db.UniqueConstraint("user_a_id", "user_b_id", name="uq_conversation_pair"),
+        db.Index("ix_conversations_user_a_id_last_message_at", "user_a_id", "last_message_at"),
+        db.Index("ix_conversations_user_b_id_last_message_at", "user_b_id", "last_message_at"),
+    )
+
 
 class PinnedConversation(db.Model):
     __tablename__ = "pinned_conversations"
@@ -229,7 +297,11 @@ class BlockedUser(db.Model):
     blocked_user_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)  # being blocked
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
-    __table_args__ = (db.UniqueConstraint("user_id", "blocked_user_id", name="uq_blocked_pair"),)
+    # uq_blocked_pair covers lookups by blocker; the index covers "who blocked me"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "blocked_user_id", name="uq_blocked_pair"),
+        db.Index("ix_blocked_users_blocked_user_id", "blocked_user_id"),
+    )
 
 
 # --------------------------
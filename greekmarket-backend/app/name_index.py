@@ -0,0 +1,286 @@
+# app/name_index.py
+"""
+Process-local autocomplete index over chapter and school names.
+
+Each entry is indexed under a handful of normalized terms: single words,
+the whole name with spaces removed ("sigmaphiepsilon"), parenthesized
+aliases and nicknames ("sigep", "tridelt"), initials, and domain parts.
+Queries are compacted the same way, so "sig ep" and "tri delt" hit the
+alias terms directly.
+
+Lookups are a bisect over the sorted term list for exact and prefix hits.
+When nothing matches that way, a fuzzy pass runs: candidates come from a
+bigram filter and are confirmed with a bounded edit-distance check.
+
+Indexes load lazily on first use. Committed School/Chapter writes in this
+process update them incrementally via session events. Writes made by other
+workers are picked up by a full reload once NAME_INDEX_TTL seconds pass.
+"""
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import islice
+
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+from . import db
+from .models import School, Chapter
+
+# Candidate entries gathered per result slot before ranking; bounds the work
+# for common terms ("sigmaphiepsilon" exists at hundreds of schools).
+SCAN_FACTOR = 4
+# Fuzzy pass: at most this many terms (most shared bigrams first) get an edit-distance check.
+MAX_FUZZY_CANDIDATES = 200
+
+
+def compact(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", (text or "").lower())
+
+
+def words(text: str) -> list:
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+def bigrams(term: str) -> set:
+    return {term[i:i + 2] for i in range(len(term) - 1)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Edit distance counting adjacent transpositions as one edit ("sigam" -> "sigma"),
+    or limit + 1 as soon as it must exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            d = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                d = min(d, prev2[j - 2] + 1)
+            cur.append(d)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def name_terms(*texts) -> set:
+    """Index terms for a name (plus nickname/domain): words, compact forms, aliases, initials."""
+    terms = set()
+    for text in texts:
+        if not text:
+            continue
+        parts = words(text)
+        terms.update(parts)
+        terms.add(compact(text))
+        for alias in re.findall(r"\(([^)]*)\)", text):
+            terms.add(compact(alias))
+        base = words(re.sub(r"\([^)]*\)", " ", text))
+        if base:
+            terms.add("".join(base))
+        if len(base) > 1:
+            terms.add("".join(w[0] for w in base))
+    terms.discard("")
+    return terms
+
+
+class NameIndex:
+    def __init__(self, loader):
+        self._loader = loader    # () -> iterable of (key, payload, terms)
+        self._lock = threading.RLock()
+        self._payloads = {}      # key -> payload dict
+        self._entry_terms = {}   # key -> set of terms
+        self._postings = {}      # term -> set of keys
+        self._sorted = []        # unique terms, sorted, for prefix bisect
+        self._grams = {}         # bigram -> set of terms
+        self.built_at = None
+
+    # -- maintenance -------------------------------------------------------
+    def rebuild(self):
+        with self._lock:
+            self._payloads, self._entry_terms = {}, {}
+            self._postings, self._sorted, self._grams = {}, [], {}
+            for key, payload, terms in self._loader():
+                self._add(key, payload, terms)
+            self.built_at = time.monotonic()
+
+    def ensure_fresh(self, ttl: float):
+        if not self._stale(ttl):
+            return
+        with self._lock:
+            # concurrent callers queue here; only the first reloads, the rest see it fresh
+            if self._stale(ttl):
+                self.rebuild()
+
+    def _stale(self, ttl: float) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at > ttl
+
+    def upsert(self, key, payload, terms):
+        with self._lock:
+            if self.built_at is None:
+                return  # not loaded yet; the first search reads from the DB
+            self._remove(key)
+            self._add(key, payload, terms)
+
+    def remove(self, key):
+        with self._lock:
+            if self.built_at is not None:
+                self._remove(key)
+
+    def _add(self, key, payload, terms):
+        self._payloads[key] = payload
+        self._entry_terms[key] = terms
+        for term in terms:
+            keys = self._postings.get(term)
+            if keys is None:
+                keys = self._postings[term] = set()
+                insort(self._sorted, term)
+                for gram in bigrams(term):
+                    self._grams.setdefault(gram, set()).add(term)
+            keys.add(key)
+
+    def _remove(self, key):
+        self._payloads.pop(key, None)
+        for term in self._entry_terms.pop(key, ()):
+            keys = self._postings.get(term)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self._postings[term]
+                i = bisect_left(self._sorted, term)
+                if i < len(self._sorted) and self._sorted[i] == term:
+                    del self._sorted[i]
+                for gram in bigrams(term):
+                    self._grams.get(gram, set()).discard(term)
+
+    # -- lookup ------------------------------------------------------------
+    def search(self, q: str, limit: int = 20) -> list:
+        """Payloads best-first: exact term, then prefix, then fuzzy by edit distance."""
+        qc = compact(q)
+        if not qc:
+            return []
+        budget = limit * SCAN_FACTOR
+        scores = {}
+
+        def collect(term, score):
+            for key in islice(self._postings[term], max(budget - len(scores), 0)):
+                scores[key] = min(scores.get(key, score), score)
+
+        with self._lock:
+            terms = self._sorted
+            i = bisect_left(terms, qc)
+            while i < len(terms) and terms[i].startswith(qc) and len(scores) < budget:
+                collect(terms[i], 0 if terms[i] == qc else 1)
+                i += 1
+
+            if not scores and len(qc) >= 3:
+                max_edits = 1 if len(qc) < 8 else 2
+                # q-gram lemma: each edit (a transposition included) destroys at most
+                # three bigrams, so a match shares >= `need` of them and must contain
+                # one of the rarest len - need + 1; only those postings are scanned.
+                grams = sorted(bigrams(qc), key=lambda g: len(self._grams.get(g, ())))
+                need = max(1, len(grams) - 3 * max_edits)
+                probe = set().union(*(self._grams.get(g, ()) for g in grams[:len(grams) - need + 1]))
+                shared = Counter({term: sum(g in term for g in grams) for term in probe})
+                for term, count in shared.most_common(MAX_FUZZY_CANDIDATES):
+                    if count < need or len(scores) >= budget:
+                        break
+                    # whole-term match, or a typo in the prefix typed so far
+                    target = term if len(term) <= len(qc) + max_edits else term[:len(qc)]
+                    dist = edit_distance(qc, target, max_edits)
+                    if dist <= max_edits:
+                        collect(term, 2 + dist)
+
+            payloads = self._payloads
+            ranked = heapq.nsmallest(
+                limit, scores, key=lambda k: (scores[k], len(payloads[k]["name"]), payloads[k]["name"])
+            )
+            return [payloads[k] for k in ranked]
+
+
+# -----------------------------------------------------------------------------
+# Chapter / school indexes
+# -----------------------------------------------------------------------------
+def chapter_payload(c) -> dict:
+    return {
+        "chapter_id": c.chapter_id,
+        "name": c.name,
+        "nickname": c.nickname,
+        "school_id": c.school_id,
+        "type": c.type,
+    }
+
+
+def school_payload(s) -> dict:
+    return {"school_id": s.school_id, "name": s.name, "domain": s.domain}
+
+
+def _load_chapters():
+    rows = db.session.query(
+        Chapter.chapter_id, Chapter.name, Chapter.nickname, Chapter.school_id, Chapter.type
+    ).all()
+    for c in rows:
+        yield c.chapter_id, chapter_payload(c), name_terms(c.name, c.nickname)
+
+
+def _load_schools():
+    for s in db.session.query(School.school_id, School.name, School.domain).all():
+        yield s.school_id, school_payload(s), name_terms(s.name, s.domain)
+
+
+chapter_index = NameIndex(_load_chapters)
+school_index = NameIndex(_load_schools)
+
+
+def search_chapters(q: str, limit: int = 20) -> list:
+    chapter_index.ensure_fresh(current_app.config["NAME_INDEX_TTL"])
+    return chapter_index.search(q, limit)
+
+
+def search_schools(q: str, limit: int = 20) -> list:
+    school_index.ensure_fresh(current_app.config["NAME_INDEX_TTL"])
+    return school_index.search(q, limit)
+
+
+# -----------------------------------------------------------------------------
+# Incremental updates: collect changes at flush, apply them only on commit
+# -----------------------------------------------------------------------------
+def _collect_changes(session, flush_context):
+    changes = session.info.setdefault("name_index_changes", [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Chapter):
+            changes.append((chapter_index, obj.chapter_id, chapter_payload(obj), name_terms(obj.name, obj.nickname)))
+        elif isinstance(obj, School):
+            changes.append((school_index, obj.school_id, school_payload(obj), name_terms(obj.name, obj.domain)))
+    for obj in session.deleted:
+        if isinstance(obj, Chapter):
+            changes.append((chapter_index, obj.chapter_id, None, None))
+        elif isinstance(obj, School):
+            changes.append((school_index, obj.school_id, None, None))
+
+
+def _apply_changes(session):
+    for index, key, payload, terms in session.info.pop("name_index_changes", []):
+        if payload is None:
+            index.remove(key)
+        else:
+            index.upsert(key, payload, terms)
+
+
+def _discard_changes(session, *args):
+    session.info.pop("name_index_changes", None)
+
+
+def init_name_indexes():
+    if not event.contains(Session, "after_flush", _collect_changes):
+        event.listen(Session, "after_flush", _collect_changes)
+        event.listen(Session, "after_commit", _apply_changes)
+        event.listen(Session, "after_rollback", _discard_changes)
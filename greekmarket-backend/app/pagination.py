@@ -0,0 +1,45 @@
+# app/pagination.py
+"""
+Keyset (cursor) pagination helpers.
+
+Cursors are opaque to clients: a urlsafe-base64 JSON list holding the sort
+key values of the last row on the previous page. Endpoints decide which
+columns go in the cursor and how to turn it back into a WHERE clause.
+"""
+import base64
+import binascii
+import json
+
+from flask import request
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Return the list of values packed by encode_cursor, or None if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def get_page_size(default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    """Read ?limit= from the request, clamped to [1, maximum]."""
+    try:
+        limit = int(request.args.get("limit", default))
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def wants_pagination() -> bool:
+    """Paginated responses are opt-in so existing clients keep getting a plain list."""
+    return "limit" in request.args or "cursor" in request.args
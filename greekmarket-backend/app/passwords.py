@@ -0,0 +1,208 @@
+# app/passwords.py
+"""
+Password hashing off the request thread.
+
+The KDF runs in a small process pool, so a login burst costs pool time and
+not the worker's threads and GIL. Other requests keep being served while
+logins wait on their hash. Pending jobs are capped. Past that, callers get
+PasswordHasherBusy and the route answers 503 instead of queueing forever.
+
+PASSWORD_HASH_ALGORITHM / PASSWORD_HASH_COST pick how new hashes are made:
+  - bcrypt  cost = log2 rounds (default 12)
+  - scrypt  cost = N           (default 32768, werkzeug's default)
+  - pbkdf2  cost = iterations  (default 600000, sha256)
+Existing hashes of any of these formats keep verifying. needs_rehash()
+tells login to upgrade a hash made with different settings.
+
+bcrypt only reads the first 72 bytes of its input, so new bcrypt hashes
+take base64(SHA-256(password)) instead and are stored as
+"bcrypt-sha256$<bcrypt hash>". Plain "$2..." hashes from before still
+verify and get upgraded on login. scrypt hashes are never rehashed into
+another algorithm: that would trade a memory-hard KDF for a weaker one.
+
+PASSWORD_HASH_WORKERS=0 hashes inline (handy for local runs).
+`flask bench-password-hashing` reports logins/sec overall and per pool worker.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import base64
+import hashlib
+
+import bcrypt
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_COSTS = {"bcrypt": 12, "scrypt": 32768, "pbkdf2": 600000}
+BCRYPT_SHA256_PREFIX = "bcrypt-sha256$"
+
+
+class PasswordHasherBusy(Exception):
+    """Too many hashes already queued; the caller should retry later."""
+
+
+# -----------------------------------------------------------------------------
+# KDF calls (module-level so the process pool can pickle them)
+# -----------------------------------------------------------------------------
+def method_id(algorithm: str, cost: int) -> str:
+    """Identifier comparable with stored_method_id()."""
+    if algorithm == "bcrypt":
+        return f"bcrypt-sha256:{cost}"
+    if algorithm == "scrypt":
+        return f"scrypt:{cost}:8:1"
+    if algorithm == "pbkdf2":
+        return f"pbkdf2:sha256:{cost}"
+    raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+
+
+def stored_method_id(stored: str) -> str:
+    if stored.startswith(BCRYPT_SHA256_PREFIX):
+        # bcrypt-sha256$$2b$12$<salt+hash>
+        return f"bcrypt-sha256:{int(stored.split('$')[3])}"
+    if stored.startswith("$2"):
+        # $2b$12$<salt+hash>, made before pre-hashing
+        return f"bcrypt:{int(stored.split('$')[2])}"
+    return stored.split("$", 1)[0]
+
+
+def _bcrypt_input(password: str) -> bytes:
+    """Fixed-length bcrypt input covering the whole password (bcrypt drops bytes past 72)."""
+    return base64.b64encode(hashlib.sha256(password.encode()).digest())
+
+
+def _hash(password: str, algorithm: str, cost: int) -> str:
+    if algorithm == "bcrypt":
+        return BCRYPT_SHA256_PREFIX + bcrypt.hashpw(_bcrypt_input(password), bcrypt.gensalt(rounds=cost)).decode()
+    return generate_password_hash(password, method=method_id(algorithm, cost))
+
+
+def _verify(stored: str, password: str) -> bool:
+    if stored.startswith(BCRYPT_SHA256_PREFIX):
+        return bcrypt.checkpw(_bcrypt_input(password), stored[len(BCRYPT_SHA256_PREFIX):].encode())
+    if stored.startswith("$2"):
+        # legacy hash: bcrypt saw at most the first 72 bytes when it was made
+        return bcrypt.checkpw(password.encode()[:72], stored.encode())
+    return check_password_hash(stored, password)
+
+
+# -----------------------------------------------------------------------------
+# Pool
+# -----------------------------------------------------------------------------
+# The pool starts inside threaded (gthread/gevent) workers. A forked child would inherit
+# locks other threads held at fork time (logging, the DB pool, imports) and can hang on
+# them, so pool processes come from a clean forkserver (spawn where there is none).
+_POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+class PasswordHasher:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._slots = None
+
+    def _submit(self, fn, *args):
+        config = current_app.config
+        workers = config["PASSWORD_HASH_WORKERS"]
+        if workers == 0:
+            return fn(*args)
+
+        for retry in (True, False):
+            with self._lock:
+                # created lazily, again after a fork (gunicorn preload), and after a pool breaks
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=_POOL_CONTEXT)
+                    self._executor_pid = os.getpid()
+                    self._slots = threading.BoundedSemaphore(workers * config["PASSWORD_HASH_QUEUE_FACTOR"])
+                executor, slots = self._executor, self._slots
+
+            if not slots.acquire(timeout=config["PASSWORD_HASH_WAIT"]):
+                raise PasswordHasherBusy()
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                # a pool process died (OOM kill, segfault); the executor is unusable from now on
+                current_app.logger.warning("Password hashing pool broke; starting a new one")
+                self._discard(executor)
+                if not retry:
+                    raise
+            finally:
+                slots.release()
+
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def hash(self, password: str) -> str:
+        algorithm, cost = settings()
+        return self._submit(_hash, password, algorithm, cost)
+
+    def verify(self, stored: str, password: str) -> bool:
+        if not stored or password is None:
+            return False
+        return self._submit(_verify, stored, password)
+
+
+password_hasher = PasswordHasher()
+
+
+def settings() -> tuple:
+    config = current_app.config
+    algorithm = config["PASSWORD_HASH_ALGORITHM"]
+    return algorithm, config["PASSWORD_HASH_COST"] or DEFAULT_COSTS[algorithm]
+
+
+def needs_rehash(stored: str) -> bool:
+    algorithm, cost = settings()
+    current = stored_method_id(stored)
+    if current.startswith("scrypt:") and algorithm != "scrypt":
+        return False  # never move a scrypt hash to a weaker algorithm
+    return current != method_id(algorithm, cost)
+
+
+# -----------------------------------------------------------------------------
+# Benchmark
+# -----------------------------------------------------------------------------
+@click.command("bench-password-hashing")
+@click.option("--logins", default=200, show_default=True, help="Password checks to run.")
+@click.option("--concurrency", default=0, help="Concurrent callers (default: 4 x pool size).")
+@with_appcontext
+def bench_password_hashing_command(logins, concurrency):
+    """Measure login throughput (one verify per login) with the configured algorithm and cost."""
+    algorithm, cost = settings()
+    pool_size = current_app.config["PASSWORD_HASH_WORKERS"] or 1  # 0 = inline: one hash at a time
+    concurrency = concurrency or pool_size * 4
+
+    stored = _hash("correct horse battery staple", algorithm, cost)
+    app = current_app._get_current_object()
+
+    def login(_):
+        with app.app_context():
+            return password_hasher.verify(stored, "correct horse battery staple")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as callers:
+        list(callers.map(login, range(min(pool_size, logins))))  # warm up the pool
+        started = time.perf_counter()
+        ok = all(callers.map(login, range(logins)))
+        elapsed = time.perf_counter() - started
+
+    rate = logins / elapsed
+    click.echo(f"{method_id(algorithm, cost)}: {logins} logins in {elapsed:.2f}s with {pool_size} pool worker(s)")
+    click.echo(f"  {rate:.1f} logins/sec, {rate / pool_size:.1f} logins/sec per pool worker, "
+               f"{1000 * elapsed * pool_size / logins:.1f} ms per login per pool worker")
+    if not ok:
+        raise SystemExit("verification failed")
+
+
+def init_passwords(app):
+    app.cli.add_command(bench_password_hashing_command)
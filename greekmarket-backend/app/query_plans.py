@@ -0,0 +1,108 @@
+# app/query_plans.py
+"""
+Query-plan regression check for the hot read paths.
+
+Each entry pairs the query an endpoint runs with the index it must use.
+`flask check-query-plans` EXPLAINs every query against the configured
+database and exits non-zero if any of them stops using its index, so it
+can run in CI next to `flask db upgrade`.
+
+On Postgres, sequential scans are disabled for the check. Tiny dev tables
+would otherwise always plan as seq scans. This asks "can the planner use
+the index?" rather than "does it prefer it right now?".
+"""
+import click
+from flask.cli import with_appcontext
+
+from . import db
+from .models import Post, PostImage, Comment, Favorite, Message, BlockedUser
+
+# (name, query builder, index that must appear in the plan)
+HOT_QUERIES = [
+    (
+        "school feed",
+        lambda: Post.query.filter_by(school_id=1).order_by(Post.created_at.desc()),
+        "ix_posts_school_id_created_at",
+    ),
+    (
+        "chapter recent posts",
+        lambda: Post.query.filter_by(chapter_id=1).order_by(Post.created_at.desc()),
+        "ix_posts_chapter_id_created_at",
+    ),
+    (
+        "posts by user",
+        lambda: Post.query.filter_by(user_id=1).order_by(Post.created_at.desc()),
+        "ix_posts_user_id_created_at",
+    ),
+    (
+        "first post images",
+        lambda: db.session.query(PostImage.post_id, db.func.min(PostImage.image_id))
+        .filter(PostImage.post_id.in_([1, 2, 3]))
+        .group_by(PostImage.post_id),
+        "ix_post_images_post_id",
+    ),
+    (
+        "post comments",
+        lambda: Comment.query.filter_by(post_id=1).order_by(Comment.created_at.asc()),
+        "ix_comments_post_id_created_at",
+    ),
+    (
+        "favorites of post",
+        lambda: Favorite.query.filter_by(post_id=1),
+        "ix_favorites_post_id",
+    ),
+    (
+        "conversation",
+        lambda: Message.query.filter(
+            Message.sender_id == 1, Message.recipient_id == 2
+        ).order_by(Message.sent_at.asc()),
+        "ix_messages_sender_id_recipient_id_sent_at",
+    ),
+    (
+        "unread count",
+        lambda: Message.query.filter_by(recipient_id=1, read=False),
+        "ix_messages_recipient_id_unread",
+    ),
+    (
+        "blocked by others",
+        lambda: BlockedUser.query.filter_by(blocked_user_id=1),
+        "ix_blocked_users_blocked_user_id",
+    ),
+]
+
+
+def explain(query) -> str:
+    """Return the database's plan for a Query/Select as one string."""
+    stmt = getattr(query, "statement", query)
+    sql = str(stmt.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}))
+    if db.engine.dialect.name == "sqlite":
+        rows = db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}")).all()
+        return "\n".join(row[-1] for row in rows)
+    db.session.execute(db.text("SET LOCAL enable_seqscan = off"))
+    rows = db.session.execute(db.text(f"EXPLAIN {sql}")).all()
+    return "\n".join(row[0] for row in rows)
+
+
+def check_query_plans() -> list:
+    """Return (name, expected index, plan) for every hot query that misses its index."""
+    failures = []
+    try:
+        for name, build, index in HOT_QUERIES:
+            plan = explain(build())
+            if index not in plan:
+                failures.append((name, index, plan))
+    finally:
+        db.session.rollback()
+    return failures
+
+
+@click.command("check-query-plans")
+@with_appcontext
+def check_query_plans_command():
+    """Fail if a hot endpoint query no longer uses its index."""
+    failures = check_query_plans()
+    for name, index, plan in failures:
+        click.echo(f"FAIL {name}: expected {index}\n{plan}\n", err=True)
+    if failures:
+        raise SystemExit(1)
+    click.echo(f"All {len(HOT_QUERIES)} hot queries use their indexes.")
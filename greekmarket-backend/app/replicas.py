@@ -0,0 +1,129 @@
+# app/replicas.py
+"""
+Read-replica routing.
+
+DATABASE_REPLICA_URLS (comma-separated) adds one Flask-SQLAlchemy bind per
+replica: "replica_0", "replica_1", ... Each request picks one replica at
+random. Then RoutingSession.get_bind sends that request's reads to it:
+
+  - SELECTs (not FOR UPDATE) go to the replica
+  - flushes, INSERT/UPDATE/DELETE and raw text() go to the primary
+  - once a request has written, the rest of it reads from the primary too
+
+Which requests use a replica depends on DB_READ_ROUTING:
+  - "decorator" (default): only views marked @use_replica
+  - "method": every GET/HEAD, except views marked @use_primary
+  - "off": never
+
+Read-your-writes: a request that wrote sets a `db_sticky` cookie for
+DB_REPLICA_STICKY_SECONDS. While that cookie is present, requests from that
+client skip the replicas. Replica lag is then invisible to the user who
+made the change, whichever worker serves their next request.
+
+To try it locally, point DATABASE_REPLICA_URLS at a copy of the primary
+(e.g. cp app.db replica.db). With SQL_STATS_HEADERS=1 (or debug), the
+X-DB-Route response header shows where each request read from.
+"""
+import random
+import time
+
+from flask import request, current_app
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND_PREFIX = "replica_"
+STICKY_COOKIE = "db_sticky"
+
+
+def use_replica(view):
+    """Route this view's reads to a replica (any DB_READ_ROUTING except "off")."""
+    view.db_route = "replica"
+    return view
+
+
+def use_primary(view):
+    """Keep this view on the primary even when DB_READ_ROUTING is "method"."""
+    view.db_route = "primary"
+    return view
+
+
+def replica_binds(config) -> dict:
+    """SQLALCHEMY_BINDS entries for the configured replicas, with the primary's pool options."""
+    from .db_pool import engine_options
+
+    binds = {}
+    for i, url in enumerate(config["DATABASE_REPLICA_URLS"]):
+        binds[f"{REPLICA_BIND_PREFIX}{i}"] = {"url": url, **engine_options({**config, "SQLALCHEMY_DATABASE_URI": url})}
+    return binds
+
+
+class RoutingSession(Session):
+    """Session that sends reads to session.info["replica"] (a bind key) when set."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        engines = self._db.engines
+        if bind is not None or engine is not engines.get(None):
+            return engine  # explicit bind, or a model on another bind
+
+        is_read = getattr(clause, "is_select", False) and getattr(clause, "_for_update_arg", None) is None
+        if self._flushing or (clause is not None and not is_read):
+            self.info["wrote"] = True
+        replica = self.info.get("replica")
+        if replica and is_read and not self._flushing and not self.info.get("wrote"):
+            return engines[replica]
+        return engine
+
+
+# -----------------------------------------------------------------------------
+# Request hooks
+# -----------------------------------------------------------------------------
+def _choose_route():
+    from . import db
+
+    config = current_app.config
+    replicas = [key for key in db.engines if key and key.startswith(REPLICA_BIND_PREFIX)]
+    policy = config["DB_READ_ROUTING"]
+    view = current_app.view_functions.get(request.endpoint)
+    marked = getattr(view, "db_route", None)
+
+    if policy == "method":
+        wanted = request.method in ("GET", "HEAD") and marked != "primary"
+    else:
+        wanted = policy == "decorator" and marked == "replica"
+
+    try:
+        sticky = float(request.cookies.get(STICKY_COOKIE) or 0) > time.time()
+    except ValueError:
+        sticky = False
+    session = db.session()
+    session.info.pop("wrote", None)
+    session.info["replica"] = random.choice(replicas) if replicas and wanted and not sticky else None
+
+
+def _finish_request(response):
+    from . import db
+
+    info = db.session().info
+    config = current_app.config
+    if info.get("wrote") and config["DB_REPLICA_STICKY_SECONDS"]:
+        window = config["DB_REPLICA_STICKY_SECONDS"]
+        response.set_cookie(
+            STICKY_COOKIE,
+            str(int(time.time() + window)),
+            max_age=window,
+            httponly=True,
+            secure=config["JWT_COOKIE_SECURE"],
+            samesite=config["JWT_COOKIE_SAMESITE"],
+        )
+    if current_app.debug or config["SQL_STATS_HEADERS"]:
+        response.headers["X-DB-Route"] = "primary" if info.get("wrote") else (info.get("replica") or "primary")
+    return response
+
+
+def init_replicas(app):
+    """Register replica binds (call before db.init_app) and the routing hooks."""
+    replicas = replica_binds(app.config)
+    app.config.setdefault("SQLALCHEMY_BINDS", {}).update(replicas)
+    if replicas:
+        app.before_request(_choose_route)
+        app.after_request(_finish_request)
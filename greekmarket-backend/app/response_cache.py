@@ -0,0 +1,454 @@
+# app/response_cache.py
+"""
+Response cache for read-heavy GET endpoints.
+
+    @bp.route("/schools/<int:school_id>")
+    @jwt_required(optional=True)
+    @cached(tags=lambda school_id: [f"school:{school_id}"])
+    def get_school_detail(school_id): ...
+
+Entries are keyed on path, sorted query string and viewer class. `viewer`
+maps the request to a class, or to None to skip the cache:
+  - anonymous (default): logged-out requests share one class; logged-in
+    requests bypass the cache (their output depends on school, chapters
+    and blocks)
+  - everyone: the output doesn't depend on the viewer at all
+
+Each entry carries surrogate-key tags: the static ones from the decorator,
+plus any the view adds with add_tags() (e.g. "post:99" for every post a
+list shows). Write routes call invalidate_on_commit("post:99", "school:3").
+Flushed School and Chapter rows tag themselves ("schools", "school:<id>",
+"chapter:<id>"), wherever the write comes from. The matching entries are
+dropped when the transaction commits, so a rolled-back write keeps its
+cache. Only 200 responses are stored, together
+with the view's ETag (app/etags.py), so hits still answer If-None-Match
+with a 304.
+
+Backends (CACHE_BACKEND):
+  - "memory": per-process LRU. Other workers' invalidations don't reach
+    it, so CACHE_DEFAULT_TTL bounds staleness across processes.
+  - "redis": shared, over the Redis protocol (Redis, Valkey, KeyDB...).
+    Needs `pip install redis`. CACHE_REDIS_URL=fakeredis:// gives an
+    in-process stand-in (`pip install fakeredis`) for local runs.
+    Connection errors count as misses, so the API keeps serving.
+  - "none": off
+
+Coalescing (CACHE_COALESCE): when a popular entry is cold, concurrent
+misses for the same key don't all run the view. The first request computes
+the response, and the others wait up to CACHE_COALESCE_WAIT seconds to
+reuse it (X-Cache: COALESCED).
+  - "process" (default): requests in this worker share one computation
+  - "shared": also takes a short lock in the backend (Redis SET NX). Other
+    workers then poll for the leader's entry instead of recomputing. The
+    lock expires on its own if its holder dies.
+  - "off"
+Waiters that time out, or whose leader got an uncacheable response,
+compute their own. single_flight.stats.summary() counts hits, misses,
+leaders, coalesced waits and timeouts per process. It is served at
+GET /internal/metrics/response-cache.
+"""
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import click
+from flask import g, request, current_app, Response
+from flask.cli import with_appcontext
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+from . import etags
+
+logger = logging.getLogger(__name__)
+
+CachedResponse = namedtuple("CachedResponse", "status mimetype body etag", defaults=(None,))
+
+
+# -----------------------------------------------------------------------------
+# Backends
+# -----------------------------------------------------------------------------
+class NullBackend:
+    def get(self, key):
+        return None
+
+    def set(self, key, value: CachedResponse, ttl: int, tags):
+        pass
+
+    def invalidate(self, tags):
+        pass
+
+    def clear(self):
+        pass
+
+    def acquire_lock(self, key, ttl: float) -> bool:
+        return True  # no shared state: only in-process coalescing applies
+
+    def release_lock(self, key):
+        pass
+
+
+class MemoryBackend(NullBackend):
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (CachedResponse, monotonic expiry, tags)
+        self._keys_by_tag = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl, tags):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic() + ttl, tuple(tags))
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in self._keys_by_tag.pop(tag, ()):
+                    self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+class RedisBackend:
+    """Entries are hashes; each tag is a set of the entry keys carrying it."""
+
+    def __init__(self, url: str, prefix: str):
+        if url.startswith("fakeredis://"):
+            import fakeredis
+
+            self.client = fakeredis.FakeRedis()
+        else:
+            import redis
+
+            self.client = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+        self.prefix = prefix
+        self.tag_ttl = 0  # tag sets outlive every entry they point at
+
+    def get(self, key):
+        try:
+            found = self.client.hgetall(self.prefix + key)
+        except Exception as e:
+            logger.warning("Response cache read failed: %s", e)
+            return None
+        if not found:
+            return None
+        etag = found.get(b"etag")
+        return CachedResponse(int(found[b"status"]), found[b"mimetype"].decode(), found[b"body"], etag.decode() if etag else None)
+
+    def set(self, key, value, ttl, tags):
+        key = self.prefix + key
+        self.tag_ttl = max(self.tag_ttl, ttl)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.hset(key, mapping={"status": value.status, "mimetype": value.mimetype, "body": value.body,
+                                    "etag": value.etag or ""})
+            pipe.expire(key, ttl)
+            for tag in tags:
+                tag_key = f"{self.prefix}tag:{tag}"
+                pipe.sadd(tag_key, key)
+                pipe.expire(tag_key, self.tag_ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning("Response cache write failed: %s", e)
+
+    def invalidate(self, tags):
+        try:
+            for tag in tags:
+                tag_key = f"{self.prefix}tag:{tag}"
+                keys = self.client.smembers(tag_key)
+                self.client.delete(tag_key, *keys)
+        except Exception as e:
+            logger.warning("Response cache invalidation failed for %s: %s", list(tags), e)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def acquire_lock(self, key, ttl):
+        """SET NX with an expiry: a crashed leader's lock lapses after `ttl`."""
+        try:
+            return bool(self.client.set(f"{self.prefix}lock:{key}", b"1", nx=True, px=int(ttl * 1000)))
+        except Exception as e:
+            logger.warning("Response cache lock failed: %s", e)
+            return True  # compute locally rather than wait on a backend that's down
+
+    def release_lock(self, key):
+        try:
+            self.client.delete(f"{self.prefix}lock:{key}")
+        except Exception as e:
+            logger.warning("Response cache unlock failed: %s", e)
+
+
+def make_backend(config):
+    kind = config["CACHE_BACKEND"]
+    if kind == "memory":
+        return MemoryBackend(config["CACHE_MAX_ENTRIES"])
+    if kind == "redis":
+        return RedisBackend(config["CACHE_REDIS_URL"], config["CACHE_KEY_PREFIX"])
+    if kind == "none":
+        return NullBackend()
+    raise ValueError(f"Unknown CACHE_BACKEND {kind!r} (memory, redis or none)")
+
+
+# -----------------------------------------------------------------------------
+# Single-flight: concurrent misses for one key wait for the first computation
+# -----------------------------------------------------------------------------
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None  # CachedResponse, if the leader produced a cacheable one
+
+
+class CoalescingStats:
+    FIELDS = ("hits", "misses", "leaders", "coalesced", "shared_waits", "wait_timeouts")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = dict.fromkeys(self.FIELDS, 0)
+
+    def incr(self, field):
+        with self._lock:
+            self.counts[field] += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+        computed = counts["leaders"]
+        saved = counts["coalesced"] + counts["shared_waits"]
+        counts["coalesced_ratio"] = round(saved / (computed + saved), 3) if computed + saved else 0.0
+        return counts
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.stats = CoalescingStats()
+
+    def join(self, key):
+        """(flight, is_leader) for `key`; the leader must call finish()."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._flights[key] = Flight()
+            return flight, True
+
+    def finish(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.done.set()
+
+
+single_flight = SingleFlight()
+
+
+def _wait_for_other_worker(backend, key, deadline):
+    """Poll the shared backend while another worker holds the key's lock."""
+    delay = 0.01
+    while time.monotonic() < deadline:
+        time.sleep(delay)
+        hit = backend.get(key)
+        if hit is not None:
+            return hit
+        if backend.acquire_lock(key, max(deadline - time.monotonic(), 0.1)):
+            backend.release_lock(key)  # that worker finished without caching; compute here
+            return None
+        delay = min(delay * 2, 0.1)
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Decorator
+# -----------------------------------------------------------------------------
+def anonymous(**view_args):
+    return None if get_jwt_identity() else "anon"
+
+
+def everyone(**view_args):
+    return "all"
+
+
+def cached(ttl: int = None, tags=None, viewer=anonymous):
+    """
+    Cache this GET view's 200 responses. `tags` is a list, or a callable taking
+    the view's URL arguments and returning one.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            backend = current_app.extensions["response_cache"]
+            viewer_class = viewer(**kwargs)
+            if viewer_class is None or request.method != "GET":
+                return view(*args, **kwargs)
+
+            query = "&".join(sorted(f"{k}={v}" for k, v in request.args.items(multi=True)))
+            key = f"{request.path}?{query}|{viewer_class}"
+            stats = single_flight.stats
+            hit = backend.get(key)
+            if hit is not None:
+                stats.incr("hits")
+                return _replay(hit, "HIT")
+            stats.incr("misses")
+
+            mode = current_app.config["CACHE_COALESCE"]
+            if mode == "off":
+                return _compute(view, args, kwargs, backend, key, ttl, tags)[0]
+
+            wait = current_app.config["CACHE_COALESCE_WAIT"]
+            flight, leader = single_flight.join(key)
+            if not leader:
+                if flight.done.wait(wait) and flight.result is not None:
+                    stats.incr("coalesced")
+                    return _replay(flight.result, "COALESCED")
+                if not flight.done.is_set():
+                    stats.incr("wait_timeouts")
+                return _compute(view, args, kwargs, backend, key, ttl, tags)[0]
+
+            locked = False
+            try:
+                if mode == "shared":
+                    locked = backend.acquire_lock(key, wait)
+                    if not locked:
+                        deadline = time.monotonic() + wait
+                        hit = _wait_for_other_worker(backend, key, deadline)
+                        if hit is not None:
+                            flight.result = hit
+                            stats.incr("shared_waits")
+                            return _replay(hit, "COALESCED")
+                        if time.monotonic() >= deadline:
+                            stats.incr("wait_timeouts")
+                stats.incr("leaders")
+                response, flight.result = _compute(view, args, kwargs, backend, key, ttl, tags)
+                return response
+            finally:
+                if locked:
+                    backend.release_lock(key)
+                single_flight.finish(key, flight)
+
+        return wrapper
+
+    return decorator
+
+
+def _replay(entry: CachedResponse, state: str):
+    if entry.etag and etags.matches(entry.etag):
+        response = etags.not_modified_response(entry.etag)
+    else:
+        response = Response(entry.body, status=entry.status, mimetype=entry.mimetype)
+        if entry.etag:
+            response.set_etag(entry.etag, weak=True)
+            response.headers["Cache-Control"] = "private, no-cache"
+    response.headers["X-Cache"] = state
+    return response
+
+
+def _compute(view, args, kwargs, backend, key, ttl, tags):
+    """Run the view and store a cacheable result; returns (response, CachedResponse or None)."""
+    static = tags(**kwargs) if callable(tags) else (tags or [])
+    g.response_cache_tags = set(static)
+    try:
+        response = current_app.make_response(view(*args, **kwargs))
+    finally:
+        entry_tags = g.pop("response_cache_tags", set())
+    entry = None
+    if response.status_code == 200 and not response.is_streamed:
+        entry = CachedResponse(response.status_code, response.mimetype, response.get_data(), g.get("etag"))
+        backend.set(key, entry, ttl or current_app.config["CACHE_DEFAULT_TTL"], entry_tags)
+    response.headers["X-Cache"] = "MISS"
+    return response, entry
+
+
+def add_tags(*tags):
+    """Tag the response the current cached view is building (no-op elsewhere)."""
+    current = g.get("response_cache_tags")
+    if current is not None:
+        current.update(tags)
+
+
+# -----------------------------------------------------------------------------
+# Invalidation: collect tags during the transaction, drop them on commit
+# -----------------------------------------------------------------------------
+def invalidate_on_commit(*tags):
+    from . import db
+
+    db.session.info.setdefault("response_cache_tags", set()).update(tags)
+
+
+def _invalidate_on_commit(session):
+    tags = session.info.pop("response_cache_tags", None)
+    if tags:
+        current_app.extensions["response_cache"].invalidate(tags)
+
+
+def _discard_on_rollback(session, *args):
+    session.info.pop("response_cache_tags", None)
+
+
+def _tag_changed_rows(session, flush_context):
+    """Schools and chapters change outside the API (seeds, shells), so their tags are collected at flush."""
+    from .models import School, Chapter
+
+    tags = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, School):
+            tags.update(("schools", f"school:{obj.school_id}"))
+        elif isinstance(obj, Chapter):
+            tags.update((f"chapter:{obj.chapter_id}", f"school:{obj.school_id}"))
+    if tags:
+        session.info.setdefault("response_cache_tags", set()).update(tags)
+
+
+@click.command("clear-response-cache")
+@with_appcontext
+def clear_response_cache_command():
+    """Drop every cached response (shared backends; memory caches are per process)."""
+    current_app.extensions["response_cache"].clear()
+    click.echo("Response cache cleared.")
+
+
+def init_response_cache(app):
+    app.extensions["response_cache"] = make_backend(app.config)
+    app.cli.add_command(clear_response_cache_command)
+    if not event.contains(Session, "after_commit", _invalidate_on_commit):
+        event.listen(Session, "after_flush", _tag_changed_rows)
+        event.listen(Session, "after_commit", _invalidate_on_commit)
+        event.listen(Session, "after_rollback", _discard_on_rollback)
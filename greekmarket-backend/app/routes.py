@@ -1,21 +1,33 @@
 # app/routes.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g, Response, current_app
 from flask_jwt_extended import (
     create_access_token, create_refresh_token,
-    jwt_required, get_jwt_identity,
+    jwt_required, get_jwt_identity, get_jwt,
     set_refresh_cookies, unset_jwt_cookies
 )
-from werkzeug.security import generate_password_hash, check_password_hash
 
 import os
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
 import stripe
 import cloudinary
 import cloudinary.uploader
 
-from . import db
+from . import db, db_pool, name_index, conversations, events
+from .pagination import encode_cursor, decode_cursor, get_page_size, wants_pagination
+from .search import rank_posts, match_messages
+from .view_counter import view_counter
+from .unread_counts import unread_cache
+from .passwords import password_hasher, needs_rehash, PasswordHasherBusy
+from .replicas import use_replica
+from .response_cache import cached, everyone, add_tags, invalidate_on_commit, single_flight
+from .etags import not_modified
+from .streaming import stream_json_array
 from .models import (
     School, User, Chapter, UserChapterMembership, Post, PostImage, Comment,
-    Favorite, Message, PinnedConversation, PostReport, UserReport, BlockedUser,
+    Favorite, Message, Conversation, PinnedConversation, PostReport, UserReport, BlockedUser,
     Purchase
 )
 
@@ -31,20 +43,102 @@ stripe.api_key = STRIPE_SECRET_KEY
 # -----------------------------------------------------------------------------
 # Helpers / Serializers
 # -----------------------------------------------------------------------------
+def blocked_user_ids(user_id) -> set:
+    """
+    Ids of everyone the user has blocked or been blocked by.
+    Loaded with one query and cached for the rest of the request.
+    """
+    if not user_id:
+        return set()
+    user_id = int(user_id)
+    cache = g.setdefault("blocked_user_ids", {})
+    if user_id not in cache:
+        rows = db.session.query(BlockedUser.user_id, BlockedUser.blocked_user_id).filter(
+            db.or_(BlockedUser.user_id == user_id, BlockedUser.blocked_user_id == user_id)
+        ).all()
+        cache[user_id] = {
+            blocked if blocker == user_id else blocker for blocker, blocked in rows
+        }
+    return cache[user_id]
+
+
 def is_blocked(user_id: int, other_user_id: int) -> bool:
     """Return True if either user has blocked the other."""
-    return BlockedUser.query.filter(
+    return int(other_user_id) in blocked_user_ids(user_id)
+
+
+def not_blocked(viewer_id, user_column):
+    """NOT EXISTS predicate: no block between the viewer and `user_column`, either direction."""
+    return ~db.exists().where(
         db.or_(
-            db.and_(
-                BlockedUser.user_id == user_id,
-                BlockedUser.blocked_user_id == other_user_id
-            ),
-            db.and_(
-                BlockedUser.user_id == other_user_id,
-                BlockedUser.blocked_user_id == user_id
-            ),
+            db.and_(BlockedUser.user_id == viewer_id, BlockedUser.blocked_user_id == user_column),
+            db.and_(BlockedUser.user_id == user_column, BlockedUser.blocked_user_id == viewer_id),
         )
-    ).first() is not None
+    )
+
+
+def exclude_blocked(query, viewer_id, user_column):
+    """Filter out rows whose `user_column` is blocked with the viewer (either direction)."""
+    blocked = blocked_user_ids(viewer_id)
+    return query.filter(user_column.notin_(blocked)) if blocked else query
+
+
+def current_user():
+    """The authenticated User, loaded at most once per request (None if anonymous or deleted)."""
+    user_id = get_jwt_identity()
+    if not user_id:
+        return None
+    cache = g.setdefault("current_user", {})
+    if user_id not in cache:
+        cache[user_id] = db.session.get(User, int(user_id))
+    return cache[user_id]
+
+
+def current_memberships() -> list:
+    """The current user's chapter memberships, loaded at most once per request."""
+    user_id = get_jwt_identity()
+    if not user_id:
+        return []
+    cache = g.setdefault("current_memberships", {})
+    if user_id not in cache:
+        cache[user_id] = UserChapterMembership.query.filter_by(user_id=int(user_id)).all()
+    return cache[user_id]
+
+
+def current_admin_membership():
+    """A chapter the current user administers (their first admin membership), or None."""
+    return next((m for m in current_memberships() if m.role == "admin"), None)
+
+
+def identity_claims(user: User) -> dict:
+    """
+    Access-token claims describing the user's scope at issue time. They can
+    go stale (a removed member keeps them until the token expires), so they
+    are only used to skip lookups when they grant nothing.
+    """
+    return {
+        "school_id": user.school_id,
+        "chapter_ids": [m.chapter_id for m in user.memberships],
+    }
+
+
+def fresh_access_token(user: User) -> str:
+    return create_access_token(identity=str(user.user_id), additional_claims=identity_claims(user))
+
+
+def viewer_school_id():
+    """The viewer's school_id from the database (None if anonymous or the token claims no school)."""
+    if get_jwt().get("school_id", 0) is None:
+        return None
+    user = current_user()
+    return user.school_id if user else None
+
+
+def viewer_chapter_ids() -> list:
+    """The viewer's chapter ids from current_memberships() (none if the token claims none)."""
+    if get_jwt().get("chapter_ids") == []:
+        return []
+    return [m.chapter_id for m in current_memberships()]
 
 
 def serialize_user(user: User) -> dict:
@@ -60,7 +154,23 @@ def serialize_user(user: User) -> dict:
     }
 
 
-def serialize_post(post: Post) -> dict:
+def serialize_message(msg: Message) -> dict:
+    return {
+        "message_id": msg.message_id,
+        "sender_id": msg.sender_id,
+        "recipient_id": msg.recipient_id,
+        "text": msg.text,
+        "image_url": msg.image_url,
+        "sent_at": msg.sent_at.isoformat(),
+    }
+
+
+_LAZY = object()
+
+
+def serialize_post(post: Post, main_image_url=_LAZY) -> dict:
+    if main_image_url is _LAZY:
+        main_image_url = post.images[0].url if post.images else None
     return {
         "post_id": post.post_id,
         "title": post.title,
@@ -73,10 +183,167 @@ def serialize_post(post: Post) -> dict:
         "is_sold": post.is_sold,
         "visibility": post.visibility,
         "created_at": post.created_at.isoformat(),
-        "main_image_url": post.images[0].url if post.images else None,
+        "main_image_url": main_image_url,
     }
 
 
+def first_image_urls(post_ids) -> dict:
+    """post_id -> url of the post's first image, in one query."""
+    post_ids = set(post_ids)
+    if not post_ids:
+        return {}
+    first = (
+        db.session.query(PostImage.post_id, db.func.min(PostImage.image_id).label("image_id"))
+        .filter(PostImage.post_id.in_(post_ids))
+        .group_by(PostImage.post_id)
+        .subquery()
+    )
+    rows = db.session.query(PostImage.post_id, PostImage.url).join(
+        first, PostImage.image_id == first.c.image_id
+    )
+    return dict(rows.all())
+
+
+def user_handles(user_ids) -> dict:
+    """user_id -> handle, in one query."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    return dict(
+        db.session.query(User.user_id, User.handle).filter(User.user_id.in_(user_ids)).all()
+    )
+
+
+def serialize_posts(posts) -> list:
+    """
+    serialize_post + user_handle for a page of posts.
+    Images and authors are batch-loaded, so the page costs two extra queries in total.
+    """
+    images = first_image_urls(p.post_id for p in posts)
+    handles = user_handles(p.user_id for p in posts)
+    return [
+        {**serialize_post(p, images.get(p.post_id)), "user_handle": handles.get(p.user_id)}
+        for p in posts
+    ]
+
+
+def serialize_post_summaries(posts) -> list:
+    """Lightweight post cards for school/chapter pages, batch-loaded like serialize_posts."""
+    images = first_image_urls(p.post_id for p in posts)
+    handles = user_handles(p.user_id for p in posts)
+    return [
+        {
+            "post_id": p.post_id,
+            "title": p.title,
+            "type": p.type,
+            "price": float(p.price) if p.price is not None else None,
+            "created_at": p.created_at.isoformat(),
+            "user_handle": handles.get(p.user_id),
+            "image_url": images.get(p.post_id),
+        }
+        for p in posts
+    ]
+
+
+def invalidate_post_caches(post: Post, *extra_tags):
+    """Drop cached responses showing `post` (its school and chapter pages) once the write commits."""
+    tags = [f"post:{post.post_id}", f"school:{post.school_id}", *extra_tags]
+    if post.chapter_id:
+        tags.append(f"chapter:{post.chapter_id}")
+    invalidate_on_commit(*tags)
+
+
+def chapter_members_changed(chapter_id: int):
+    """Bump the chapter's updated_at (its ETag) and drop its cached page once the membership write commits."""
+    Chapter.query.filter_by(chapter_id=chapter_id).update(
+        {Chapter.updated_at: datetime.utcnow()}, synchronize_session=False
+    )
+    invalidate_on_commit(f"chapter:{chapter_id}")
+
+
+def set_user_school(user: User, school_id: int):
+    """Move `user` to `school_id`, dropping both schools' cached pages once the write commits."""
+    # both schools' pages show member counts and school-only posts per viewer class
+    invalidate_on_commit(f"school:{school_id}", *([f"school:{user.school_id}"] if user.school_id else []))
+    user.school_id = school_id
+
+
+def page_version(posts) -> tuple:
+    """ETag parts for a page of posts already loaded: ids and updated_at in order, no extra query."""
+    return tuple(part for post in posts for part in (post.post_id, post.updated_at))
+
+
+def serialize_purchases(rows) -> list:
+    """(Purchase, Post) rows -> purchase cards; images and sellers are batch-loaded."""
+    images = first_image_urls(post.post_id for _, post in rows)
+    seller_ids = {post.user_id for _, post in rows}
+    sellers = {u.user_id: u for u in User.query.filter(User.user_id.in_(seller_ids))} if seller_ids else {}
+    return [
+        {
+            "purchase_id": purchase.purchase_id,
+            "post_id": post.post_id,
+            "title": post.title,
+            "price": post.price,
+            "image_url": images.get(post.post_id),
+            "purchased_at": purchase.purchased_at.isoformat(),
+            "seller": {
+                "user_id": post.user_id,
+                "first_name": sellers[post.user_id].first_name,
+                "last_name": sellers[post.user_id].last_name,
+                "handle": sellers[post.user_id].handle,
+            },
+        }
+        for purchase, post in rows
+    ]
+
+
+def post_feed_order(sort: str) -> list:
+    """ORDER BY for a post feed. post_id breaks ties so keyset cursors are stable."""
+    if sort == "price":
+        return [Post.price.asc().nullslast(), Post.post_id.asc()]
+    if sort == "-price":
+        return [Post.price.desc().nullslast(), Post.post_id.desc()]
+    return [Post.created_at.desc(), Post.post_id.desc()]
+
+
+def post_feed_cursor(post: Post, sort: str) -> str:
+    key = post.price if sort in ("price", "-price") else post.created_at.isoformat()
+    return encode_cursor(sort, key, post.post_id)
+
+
+def post_feed_after(sort: str, cursor: str):
+    """
+    WHERE clause for rows strictly after `cursor` in `sort` order.
+    Returns None if the cursor is malformed or was issued for another sort.
+    """
+    values = decode_cursor(cursor)
+    if not values or len(values) != 3 or values[0] != sort or not isinstance(values[2], int):
+        return None
+    _, key, last_id = values
+
+    if sort in ("price", "-price"):
+        ascending = sort == "price"
+        next_id = Post.post_id > last_id if ascending else Post.post_id < last_id
+        if key is None:
+            # NULL prices sort last in both directions
+            return db.and_(Post.price.is_(None), next_id)
+        try:
+            key = Decimal(str(key))
+        except InvalidOperation:
+            return None
+        past_key = Post.price > key if ascending else Post.price < key
+        return db.or_(past_key, db.and_(Post.price == key, next_id), Post.price.is_(None))
+
+    try:
+        key = datetime.fromisoformat(key)
+    except (TypeError, ValueError):
+        return None
+    return db.or_(
+        Post.created_at < key,
+        db.and_(Post.created_at == key, Post.post_id < last_id),
+    )
+
+
 # -----------------------------------------------------------------------------
 # Root / Health
 # -----------------------------------------------------------------------------
@@ -85,6 +352,28 @@ def home():
     return jsonify({"message": "Welcome to GreekVault API!"})
 
 
+def metrics_allowed() -> bool:
+    """Internal metrics need METRICS_TOKEN in X-Metrics-Token; without the setting they don't exist."""
+    token = current_app.config["METRICS_TOKEN"]
+    return bool(token) and request.headers.get("X-Metrics-Token") == token
+
+
+@bp.route("/internal/metrics/db-pool")
+def db_pool_metrics():
+    """Connection pool gauges for this worker process."""
+    if not metrics_allowed():
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"pid": os.getpid(), "engines": db_pool.snapshot(db.engines)})
+
+
+@bp.route("/internal/metrics/response-cache")
+def response_cache_metrics():
+    """Cache hit and request-coalescing counters for this worker process."""
+    if not metrics_allowed():
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"pid": os.getpid(), **single_flight.stats.summary()})
+
+
 # -----------------------------------------------------------------------------
 # Auth
 # -----------------------------------------------------------------------------
@@ -106,14 +395,19 @@ def register_user():
     if not school:
         return jsonify({"error": "Invalid school_id"}), 400
 
+    try:
+        password_hash = password_hasher.hash(data["password"])
+    except PasswordHasherBusy:
+        return jsonify({"error": "Server busy, please try again"}), 503
+
     user = User(
         first_name=data.get("first_name"),
         last_name=data.get("last_name"),
         email=data["email"],
         handle=data["handle"],
-        school_id=school.school_id,
-        password_hash=generate_password_hash(data["password"]),
+        password_hash=password_hash,
     )
+    set_user_school(user, school.school_id)
     db.session.add(user)
     db.session.commit()
     return jsonify({"message": "User registered on GreekVault!", "user_id": user.user_id}), 201
@@ -124,8 +418,21 @@ def login_user():
     data = request.get_json() or {}
     user = User.query.filter_by(email=data.get("email")).first()
 
-    if user and check_password_hash(user.password_hash, data.get("password")):
-        access_token = create_access_token(identity=str(user.user_id))
+    try:
+        valid = bool(user) and password_hasher.verify(user.password_hash, data.get("password"))
+    except PasswordHasherBusy:
+        return jsonify({"error": "Server busy, please try again"}), 503
+
+    if valid and needs_rehash(user.password_hash):
+        # hashing settings changed since this hash was made; upgrade it while we have the password
+        try:
+            user.password_hash = password_hasher.hash(data["password"])
+            db.session.commit()
+        except PasswordHasherBusy:
+            pass  # the login itself succeeded; a later login upgrades the hash
+
+    if valid:
+        access_token = fresh_access_token(user)
         refresh_token = create_refresh_token(identity=str(user.user_id))
         resp = jsonify(access_token=access_token)
         set_refresh_cookies(resp, refresh_token)  # HttpOnly cookie
@@ -137,9 +444,10 @@ def login_user():
 @bp.route("/token/refresh", methods=["POST"])
 @jwt_required(refresh=True)
 def refresh_access_token():
-    user_id = get_jwt_identity()
-    new_access = create_access_token(identity=str(user_id))
-    return jsonify(access_token=new_access), 200
+    user = current_user()
+    if not user:
+        return jsonify({"error": "User not found"}), 401
+    return jsonify(access_token=fresh_access_token(user)), 200
 
 
 @bp.route("/logout", methods=["POST"])
@@ -155,12 +463,12 @@ def logout():
 @bp.route("/me", methods=["GET"])
 @jwt_required()
 def get_profile():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
 
-    membership = UserChapterMembership.query.filter_by(user_id=user.user_id).first()
+    memberships = current_memberships()
+    membership = memberships[0] if memberships else None
     chapter_name = chapter_id = chapter_role = None
     if membership:
         chapter = Chapter.query.get(membership.chapter_id)
@@ -184,8 +492,7 @@ def update_profile():
     Minimal profile update (currently supports setting school_id).
     Body: { "school_id": <int> }
     """
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
 
@@ -196,18 +503,27 @@ def update_profile():
         school = School.query.get(school_id)
         if not school:
             return jsonify({"error": "Invalid school_id"}), 400
-        user.school_id = school.school_id
+        if user.school_id != school.school_id:
+            set_user_school(user, school.school_id)
 
     db.session.commit()
-    return jsonify({"message": "Profile updated.", "school_id": user.school_id})
+    return jsonify({
+        "message": "Profile updated.",
+        "school_id": user.school_id,
+        "access_token": fresh_access_token(user),  # school_id claim changed
+    })
 
 
 # -----------------------------------------------------------------------------
 # Lookups / Search
 # -----------------------------------------------------------------------------
 @bp.route("/schools", methods=["GET"])
+@cached(tags=["schools"], viewer=everyone)
 def get_schools():
     schools = School.query.all()
+    unchanged = not_modified(*(part for s in schools for part in (s.school_id, s.updated_at)))
+    if unchanged:
+        return unchanged
     return jsonify([{"id": s.school_id, "name": s.name, "domain": s.domain} for s in schools])
 
 
@@ -216,10 +532,7 @@ def search_schools():
     q = (request.args.get("q") or "").strip().lower()
     if not q:
         return jsonify([])
-    schools = School.query.filter(
-        db.or_(School.name.ilike(f"%{q}%"), School.domain.ilike(f"%{q}%"))
-    ).all()
-    return jsonify([{"school_id": s.school_id, "name": s.name, "domain": s.domain} for s in schools])
+    return jsonify(name_index.search_schools(q, get_page_size(maximum=50)))
 
 
 @bp.route("/search/chapters", methods=["GET"])
@@ -227,20 +540,7 @@ def search_chapters():
     q = (request.args.get("q") or "").strip().lower()
     if not q:
         return jsonify([])
-    chapters = Chapter.query.all()
-    matches = []
-    for c in chapters:
-        name = (c.name or "").lower()
-        nickname = (c.nickname or "").lower()
-        if q in name or q in nickname:
-            matches.append({
-                "chapter_id": c.chapter_id,
-                "name": c.name,
-                "nickname": c.nickname,
-                "school_id": c.school_id,
-                "type": c.type,
-            })
-    return jsonify(matches)
+    return jsonify(name_index.search_chapters(q, get_page_size(maximum=50)))
 
 
 @bp.route("/search/users", methods=["GET"])
@@ -252,58 +552,101 @@ def search_users():
 
     me = get_jwt_identity()
 
-    # Who I blocked
-    blocked_ids = {
-        b.blocked_user_id for b in BlockedUser.query.filter_by(user_id=me).all()
-    }
-    # Who blocked me
-    blocked_by_ids = {
-        b.user_id for b in BlockedUser.query.filter_by(blocked_user_id=me).all()
-    }
-    excluded = blocked_ids | blocked_by_ids
-
-    users = User.query.filter(
-        ~User.user_id.in_(excluded),
+    # Exact handle, then handle prefix, then name prefix, then substring anywhere.
+    # The ILIKE predicates are served by the pg_trgm GIN indexes.
+    handle = db.func.lower(User.handle)
+    rank = db.case(
+        (handle == q, 0),
+        (User.handle.istartswith(q, autoescape=True), 1),
+        (db.or_(
+            User.first_name.istartswith(q, autoescape=True),
+            User.last_name.istartswith(q, autoescape=True),
+        ), 2),
+        else_=3,
+    )
+    query = User.query.filter(
+        not_blocked(me, User.user_id),
         db.or_(
-            User.first_name.ilike(f"%{q}%"),
-            User.last_name.ilike(f"%{q}%"),
-            User.email.ilike(f"%{q}%"),
-            User.handle.ilike(f"%{q}%"),
-        )
-    ).all()
-    return jsonify([serialize_user(u) for u in users])
+            User.first_name.icontains(q, autoescape=True),
+            User.last_name.icontains(q, autoescape=True),
+            User.email.icontains(q, autoescape=True),
+            User.handle.icontains(q, autoescape=True),
+        ),
+    )
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        values = decode_cursor(cursor)
+        if not values or len(values) != 2 or not isinstance(values[0], int) or not isinstance(values[1], str):
+            return jsonify({"error": "Invalid cursor"}), 400
+        last_rank, last_handle = values
+        query = query.filter(db.or_(rank > last_rank, db.and_(rank == last_rank, User.handle > last_handle)))
+
+    # Results are always capped; ?limit= / ?cursor= switch to the paginated shape.
+    limit = get_page_size(maximum=50)
+    rows = query.add_columns(rank).order_by(rank, User.handle).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0].handle)
+
+    users = [serialize_user(u) for u, _ in rows]
+    if wants_pagination():
+        return jsonify({"users": users, "next_cursor": next_cursor})
+    return jsonify(users)
 
 
 @bp.route("/search/posts", methods=["GET"])
+@use_replica
 @jwt_required(optional=True)
+@cached(ttl=15)  # new posts show up in anonymous results within 15s
 def search_posts():
     viewer_id = get_jwt_identity()
     q = (request.args.get("q") or "").strip().lower()
     if not q:
         return jsonify({"error": "Missing query string"}), 400
 
-    viewer = User.query.get(viewer_id) if viewer_id else None
-    viewer_school_id = viewer.school_id if viewer else None
-
-    chapter_ids = []
-    if viewer_id:
-        chapter_ids = [
-            m.chapter_id for m in UserChapterMembership.query.filter_by(user_id=viewer_id)
-        ]
-
-    posts = Post.query.filter(
-        db.and_(
-            db.or_(Post.title.ilike(f"%{q}%"), Post.description.ilike(f"%{q}%")),
-            db.or_(
-                Post.visibility == "public",
-                db.and_(Post.visibility == "school", Post.school_id == viewer_school_id),
-                db.and_(Post.visibility == "chapter", Post.chapter_id.in_(chapter_ids)),
-            ),
+    viewer_school, chapter_ids = viewer_school_id(), viewer_chapter_ids()
+    query = Post.query.filter(
+        db.or_(
+            Post.visibility == "public",
+            db.and_(Post.visibility == "school", Post.school_id == viewer_school),
+            db.and_(Post.visibility == "chapter", Post.chapter_id.in_(chapter_ids)),
         )
-    ).order_by(Post.created_at.desc()).all()
+    )
+    ranked = rank_posts(exclude_blocked(query, viewer_id, Post.user_id), q)
+    if ranked is None:
+        return jsonify({"error": "Missing query string"}), 400
+
+    # Opt-in pagination, same shape as the school feed. Relevance order has no
+    # natural keyset, so the opaque cursor carries an offset. Without it the
+    # plain list is still capped at one default-sized page of the best matches.
+    paginate = wants_pagination()
+    next_cursor = None
+    limit = get_page_size()
+    if paginate:
+        offset = 0
+        cursor = request.args.get("cursor")
+        if cursor:
+            values = decode_cursor(cursor)
+            if not values or len(values) != 2 or values[0] != "search" or not isinstance(values[1], int):
+                return jsonify({"error": "Invalid cursor"}), 400
+            offset = max(values[1], 0)
+        rows = ranked.offset(offset).limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor("search", offset + limit)
+    else:
+        rows = ranked.limit(limit).all()
 
-    visible = [p for p in posts if not viewer_id or not is_blocked(viewer_id, p.user_id)]
-    return jsonify([{**serialize_post(p), "user_handle": p.user.handle} for p in visible])
+    results = [
+        {**item, "rank": float(rank or 0)}
+        for item, (_, rank) in zip(serialize_posts([p for p, _ in rows]), rows)
+    ]
+    add_tags(*(f"post:{p.post_id}" for p, _ in rows))
+    if paginate:
+        return jsonify({"posts": results, "next_cursor": next_cursor})
+    return jsonify(results)
 
 
 # -----------------------------------------------------------------------------
@@ -312,6 +655,7 @@ def search_posts():
 
 @bp.route("/chapters/<int:chapter_id>", methods=["GET"])
 @jwt_required(optional=True)
+@cached(tags=lambda chapter_id: [f"chapter:{chapter_id}"])
 def get_chapter_detail(chapter_id):
     """
     Chapter profile:
@@ -329,30 +673,22 @@ def get_chapter_detail(chapter_id):
     # membership for current user
     is_member = False
     if user_id:
-        is_member = UserChapterMembership.query.filter_by(
-            user_id=user_id, chapter_id=chapter_id
-        ).first() is not None
-
-    # stats
-    member_count = UserChapterMembership.query.filter_by(chapter_id=chapter_id).count()
+        is_member = chapter_id in viewer_chapter_ids()
 
     recent_posts_q = (
         Post.query.filter_by(chapter_id=chapter_id)
         .order_by(Post.created_at.desc())
         .limit(12)
     )
-    recent_posts = [
-        {
-            "post_id": p.post_id,
-            "title": p.title,
-            "type": p.type,
-            "price": float(p.price) if p.price is not None else None,
-            "created_at": p.created_at.isoformat(),
-            "user_handle": p.user.handle if p.user else None,
-            "image_url": p.images[0].url if p.images else None,
-        }
-        for p in recent_posts_q.all()
-    ]
+    recent = recent_posts_q.all()
+    # membership changes bump chapter.updated_at
+    unchanged = not_modified(is_member, chapter.updated_at, *page_version(recent))
+    if unchanged:
+        return unchanged
+
+    # stats
+    member_count = UserChapterMembership.query.filter_by(chapter_id=chapter_id).count()
+    recent_posts = serialize_post_summaries(recent)
 
     memberships = UserChapterMembership.query.filter_by(chapter_id=chapter_id).all()
     user_ids = [m.user_id for m in memberships]
@@ -396,6 +732,9 @@ def get_chapter_detail(chapter_id):
 def join_chapter_by_id(chapter_id):
     """Join a chapter by id (canonical join endpoint)."""
     user_id = get_jwt_identity()
+    user = current_user()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
     chapter = Chapter.query.get(chapter_id)
     if not chapter:
         return jsonify({"error": "Chapter not found"}), 404
@@ -407,8 +746,10 @@ def join_chapter_by_id(chapter_id):
         return jsonify({"message": "Already a member"}), 200
 
     db.session.add(UserChapterMembership(user_id=user_id, chapter_id=chapter_id, role="member"))
+    chapter_members_changed(chapter_id)
     db.session.commit()
-    return jsonify({"message": "Joined chapter!"}), 201
+    # chapter_ids claim changed
+    return jsonify({"message": "Joined chapter!", "access_token": fresh_access_token(user)}), 201
 
 
 # -----------------------------------------------------------------------------
@@ -422,7 +763,7 @@ def create_post():
     Accepts JSON body or multipart/form-data.
     """
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
     if not user.school_id:
@@ -474,6 +815,7 @@ def create_post():
             if url:
                 db.session.add(PostImage(post_id=post.post_id, url=url))
 
+        invalidate_post_caches(post, "posts:recent")
         db.session.commit()
         return jsonify(serialize_post(post)), 201
     except Exception as e:
@@ -483,22 +825,19 @@ def create_post():
 
 
 @bp.route("/posts/<int:school_id>", methods=["GET"])
+@use_replica
 @jwt_required(optional=True)
+@cached(tags=lambda school_id: [f"school:{school_id}"])
 def get_posts_for_school(school_id):
     viewer_id = get_jwt_identity()
-    viewer = User.query.get(viewer_id) if viewer_id else None
-
-    allowed_chapter_ids = []
-    if viewer:
-        allowed_chapter_ids = [
-            m.chapter_id for m in UserChapterMembership.query.filter_by(user_id=viewer_id)
-        ]
+    viewer_school, allowed_chapter_ids = viewer_school_id(), viewer_chapter_ids()
 
     q = Post.query.filter_by(school_id=school_id)
+    q = exclude_blocked(q, viewer_id, Post.user_id)
     q = q.filter(
         db.or_(
             Post.visibility == "public",
-            db.and_(Post.visibility == "school", viewer and Post.school_id == viewer.school_id),
+            db.and_(Post.visibility == "school", Post.school_id == viewer_school),
             db.and_(Post.visibility == "chapter", Post.chapter_id.in_(allowed_chapter_ids)),
         )
     )
@@ -508,21 +847,36 @@ def get_posts_for_school(school_id):
         q = q.filter_by(type=post_type)
 
     sort = request.args.get("sort")
-    if sort == "price":
-        q = q.order_by(Post.price.asc())
-    elif sort == "-price":
-        q = q.order_by(Post.price.desc())
+    if sort not in ("price", "-price"):
+        sort = "new"
+    q = q.order_by(*post_feed_order(sort))
+
+    # Opt-in keyset pagination: ?limit=N[&cursor=...] -> {"posts": [...], "next_cursor": ...}
+    paginate = wants_pagination()
+    next_cursor = None
+    if paginate:
+        cursor = request.args.get("cursor")
+        if cursor:
+            after = post_feed_after(sort, cursor)
+            if after is None:
+                return jsonify({"error": "Invalid cursor"}), 400
+            q = q.filter(after)
+        limit = get_page_size()
+        posts = q.limit(limit + 1).all()
+        if len(posts) > limit:
+            posts = posts[:limit]
+            next_cursor = post_feed_cursor(posts[-1], sort)
     else:
-        q = q.order_by(Post.created_at.desc())
+        posts = q.all()
 
-    posts = q.all()
-    result = []
-    for p in posts:
-        if viewer_id and is_blocked(viewer_id, p.user_id):
-            continue
-        item = serialize_post(p)
-        item["user_handle"] = p.user.handle
-        result.append(item)
+    # The version covers the page actually returned, so it costs no query of its own
+    unchanged = not_modified(viewer_id, next_cursor, *page_version(posts))
+    if unchanged:
+        return unchanged
+
+    result = serialize_posts(posts)
+    if paginate:
+        return jsonify({"posts": result, "next_cursor": next_cursor})
     return jsonify(result)
 
 
@@ -537,12 +891,16 @@ def get_post_detail(post_id):
     if viewer_id and is_blocked(viewer_id, post.user_id):
         return jsonify({"error": "You are not allowed to view this post"}), 403
 
-    post.views += 1
-    db.session.commit()
+    view_counter.record(post_id, viewer_id or request.remote_addr)
+    # Views aren't part of the validator: a 304 may show a slightly stale count
+    unchanged = not_modified(post.updated_at)
+    if unchanged:
+        return unchanged
+    views = (post.views or 0) + view_counter.pending(post_id)
 
     data = serialize_post(post)
     data["image_urls"] = [img.url for img in post.images]
-    data["views"] = post.views
+    data["views"] = views
     data["user_handle"] = post.user.handle
     return jsonify(data)
 
@@ -551,8 +909,7 @@ def get_post_detail(post_id):
 @jwt_required()
 def get_my_posts():
     me = get_jwt_identity()
-    posts = Post.query.filter_by(user_id=me).order_by(Post.created_at.desc()).all()
-    return jsonify([{**serialize_post(p), "user_handle": p.user.handle} for p in posts])
+    return stream_json_array(Post.query.filter_by(user_id=me).order_by(Post.created_at.desc()), serialize_posts)
 
 
 @bp.route("/posts/<int:post_id>", methods=["PUT"])
@@ -576,6 +933,8 @@ def edit_post(post_id):
         for url in data["image_urls"]:
             db.session.add(PostImage(post_id=post_id, url=url))
 
+    post.updated_at = datetime.utcnow()  # image-only edits don't touch the row
+    invalidate_post_caches(post)
     db.session.commit()
     return jsonify({"message": "Post updated successfully"}), 200
 
@@ -590,6 +949,7 @@ def mark_post_sold(post_id):
     if post.user_id != me:
         return jsonify({"error": "You can only mark your own posts as sold"}), 403
     post.is_sold = True
+    invalidate_post_caches(post)
     db.session.commit()
     return jsonify({"message": "Post marked as SOLD!"}), 200
 
@@ -633,14 +993,14 @@ def add_comment(post_id):
 
 @bp.route("/posts/<int:post_id>/comments", methods=["GET"])
 def get_comments(post_id):
-    comments = Comment.query.filter_by(post_id=post_id).order_by(Comment.created_at.asc()).all()
-    return jsonify([
+    comments = Comment.query.filter_by(post_id=post_id).order_by(Comment.created_at.asc(), Comment.comment_id.asc())
+    return stream_json_array(comments, lambda batch: [
         {
             "comment_id": c.comment_id,
             "user_id": c.user_id,
             "text": c.text,
             "created_at": c.created_at.isoformat(),
-        } for c in comments
+        } for c in batch
     ])
 
 
@@ -678,21 +1038,24 @@ def unfavorite_post(post_id):
 @jwt_required()
 def get_my_favorites():
     me = get_jwt_identity()
-    favorites = Favorite.query.filter_by(user_id=me).all()
-    post_ids = [f.post_id for f in favorites]
-    posts = Post.query.filter(Post.post_id.in_(post_ids)).all()
-    visible = [p for p in posts if not is_blocked(me, p.user_id)]
-    return jsonify([{**serialize_post(p), "user_handle": p.user.handle} for p in visible])
+    q = Post.query.join(Favorite, Favorite.post_id == Post.post_id).filter(Favorite.user_id == me)
+    q = exclude_blocked(q, me, Post.user_id)
+    posts = q.all()
+    unchanged = not_modified(me, *page_version(posts))
+    if unchanged:
+        return unchanged
+    return jsonify(serialize_posts(posts))
 
 
 # Analytics (public post)
 @bp.route("/analytics/post/<int:post_id>", methods=["GET"])
+@use_replica
 def get_post_analytics(post_id):
     post = Post.query.get(post_id)
     if not post:
         return jsonify({"error": "Post not found"}), 404
 
-    view_count = post.views or 0
+    view_count = (post.views or 0) + view_counter.pending(post_id)
     comment_count = Comment.query.filter_by(post_id=post_id).count()
     image_count = PostImage.query.filter_by(post_id=post_id).count()
     return jsonify({"post_id": post_id, "views": view_count, "comments": comment_count, "images": image_count}), 200
@@ -703,11 +1066,13 @@ def get_post_analytics(post_id):
 # -----------------------------------------------------------------------------
 @bp.route("/activity/posts", methods=["GET"])
 @jwt_required(optional=True)
+@cached(tags=["posts:recent"])
 def recent_posts():
     viewer_id = get_jwt_identity()
-    posts = Post.query.order_by(Post.created_at.desc()).limit(20).all()
-    visible = [p for p in posts if not viewer_id or not is_blocked(viewer_id, p.user_id)]
-    return jsonify([{**serialize_post(p), "user_handle": p.user.handle} for p in visible])
+    q = exclude_blocked(Post.query, viewer_id, Post.user_id)
+    posts = q.order_by(Post.created_at.desc()).limit(20).all()
+    add_tags(*(f"post:{p.post_id}" for p in posts))
+    return jsonify(serialize_posts(posts))
 
 
 @bp.route("/activity/comments", methods=["GET"])
@@ -744,7 +1109,12 @@ def send_message():
 
     msg = Message(sender_id=sender_id, recipient_id=recipient_id, text=text, image_url=image_url)
     db.session.add(msg)
+    db.session.flush()
+    conversations.record_message(msg)
     db.session.commit()
+
+    events.publish(msg.recipient_id, "message", serialize_message(msg))
+    publish_unread_count(msg.recipient_id)
     return jsonify({"message": "Message sent!"}), 201
 
 
@@ -755,23 +1125,38 @@ def get_conversation(user_id):
     if is_blocked(me, user_id):
         return jsonify({"error": "You cannot view this conversation"}), 403
 
-    messages = Message.query.filter(
-        db.or_(
-            db.and_(Message.sender_id == me, Message.recipient_id == user_id),
-            db.and_(Message.sender_id == user_id, Message.recipient_id == me),
-        )
-    ).order_by(Message.sent_at.asc()).all()
-
-    return jsonify([
-        {
-            "message_id": m.message_id,
-            "sender_id": m.sender_id,
-            "recipient_id": m.recipient_id,
-            "text": m.text,
-            "image_url": m.image_url,
-            "sent_at": m.sent_at.isoformat(),
-        } for m in messages
-    ])
+    # ?before= / ?after= / ?limit= -> {"messages": [...], "has_more": ..., cursors};
+    # a bare request still gets the whole history as a plain list (streamed).
+    if not any(k in request.args for k in ("before", "after", "limit")):
+        query = Message.query.filter(
+            db.or_(
+                db.and_(Message.sender_id == me, Message.recipient_id == user_id),
+                db.and_(Message.sender_id == user_id, Message.recipient_id == me),
+            )
+        ).order_by(Message.sent_at.asc(), Message.message_id.asc())
+        return stream_json_array(query, lambda batch: [serialize_message(m) for m in batch])
+
+    before, after = request.args.get("before"), request.args.get("after")
+    if before is not None and after is not None:
+        return jsonify({"error": "Use either before or after, not both"}), 400
+    anchor = None
+    if before is not None or after is not None:
+        anchor = conversations.resolve_anchor(me, user_id, before if before is not None else after)
+        if anchor is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    messages, has_more = conversations.history_page(
+        me, user_id, get_page_size(default=50, maximum=200),
+        before=anchor if before is not None else None,
+        after=anchor if after is not None else None,
+    )
+    return jsonify({
+        "messages": [serialize_message(m) for m in messages],
+        "has_more": has_more,
+        # pass back as before= / after=; they stay valid if that message is deleted
+        "before_cursor": conversations.history_cursor(messages[0]) if messages else before,
+        "after_cursor": conversations.history_cursor(messages[-1]) if messages else after,
+    })
 
 
 @bp.route("/messages/inbox", methods=["GET"])
@@ -779,44 +1164,48 @@ def get_conversation(user_id):
 def inbox():
     me = int(get_jwt_identity())
 
-    pinned_users = {p.other_user_id for p in PinnedConversation.query.filter_by(user_id=me).all()}
-    messages = Message.query.filter(
-        db.or_(Message.sender_id == me, Message.recipient_id == me)
-    ).order_by(Message.sent_at.desc()).all()
-
-    conversations = {}
-    for msg in messages:
-        other = msg.recipient_id if msg.sender_id == me else msg.sender_id
-        if is_blocked(me, other):
-            continue
-
-        key = tuple(sorted([me, other]))
-        if key not in conversations:
-            unread = Message.query.filter_by(sender_id=other, recipient_id=me, read=False).count()
-            conversations[key] = {
-                "user_id": other,
-                "last_message": msg.text,
-                "timestamp": msg.sent_at.isoformat(),
-                "unread_count": unread,
-                "pinned": other in pinned_users,
-            }
-
-    sorted_convos = sorted(
-        conversations.values(),
-        key=lambda c: (not c["pinned"], c["timestamp"]),
-        reverse=True,
+    # One query against the conversations read model; pinned first, then newest.
+    mine_a = Conversation.user_a_id == me
+    other = db.case((mine_a, Conversation.user_b_id), else_=Conversation.user_a_id)
+    unread = db.case((mine_a, Conversation.unread_a), else_=Conversation.unread_b)
+    pinned = db.case((mine_a, Conversation.pinned_a), else_=Conversation.pinned_b)
+    rows = (
+        db.session.query(
+            other.label("user_id"), Conversation.last_message_text, Conversation.last_message_at,
+            unread.label("unread_count"), pinned.label("pinned"),
+        )
+        .filter(
+            db.or_(Conversation.user_a_id == me, Conversation.user_b_id == me),
+            Conversation.last_message_id.isnot(None),
+            not_blocked(me, other),
+        )
+        .order_by(pinned.desc(), Conversation.last_message_at.desc())
+        .all()
     )
-    return jsonify(sorted_convos)
+    return jsonify([
+        {
+            "user_id": r.user_id,
+            "last_message": r.last_message_text,
+            "timestamp": r.last_message_at.isoformat() if r.last_message_at else None,
+            "unread_count": r.unread_count,
+            "pinned": bool(r.pinned),
+        } for r in rows
+    ])
 
 
 @bp.route("/messages/<int:with_user_id>/read", methods=["POST"])
 @jwt_required()
 def mark_messages_as_read(with_user_id):
     me = get_jwt_identity()
-    messages = Message.query.filter_by(sender_id=with_user_id, recipient_id=me, read=False).all()
-    for m in messages:
-        m.read = True
+    watermark, updated = conversations.mark_read(me, with_user_id)
     db.session.commit()
+
+    if updated:
+        events.publish(with_user_id, "read", {
+            "reader_id": int(me),
+            "last_read_message_id": watermark,
+        })
+        publish_unread_count(me)  # the reader's other tabs/devices
     return jsonify({"message": "Messages marked as read"}), 200
 
 
@@ -829,8 +1218,13 @@ def delete_message(message_id):
         return jsonify({"error": "Message not found"}), 404
     if message.sender_id != me:
         return jsonify({"error": "You can only delete your own messages"}), 403
+    was_unread = not message.read
     db.session.delete(message)
+    db.session.flush()
+    conversations.record_delete(message)
     db.session.commit()
+    if was_unread:
+        publish_unread_count(message.recipient_id)
     return jsonify({"message": "Message deleted"}), 200
 
 
@@ -850,16 +1244,62 @@ def edit_message(message_id):
         return jsonify({"error": "New message text required"}), 400
 
     message.text = new_text
+    conversations.record_edit(message)
     db.session.commit()
     return jsonify({"message": "Message updated"}), 200
 
 
+@bp.route("/events/stream", methods=["GET"])
+@jwt_required(locations=["headers", "query_string"])  # EventSource can't set headers: ?jwt=<token>
+def event_stream():
+    """
+    Server-Sent Events stream of the caller's realtime events:
+      event: message -> a new message sent to you
+      event: read    -> someone read the messages you sent them
+      event: unread  -> your unread total changed ({"unread_count": n})
+      event: expired -> the token in ?jwt= expired; the stream ends, reconnect with a fresh one
+    """
+    me = int(get_jwt_identity())
+    expires_at = get_jwt().get("exp")  # epoch seconds
+    keepalive = current_app.config["SSE_KEEPALIVE"]
+    # Each stream pins a worker thread; past the cap, shed it rather than starve regular requests
+    if not events.stream_slots.acquire(current_app.config["SSE_MAX_STREAMS"]):
+        return jsonify({"error": "Too many open event streams"}), 503, {"Retry-After": str(keepalive)}
+    subscription = events.get_broker().subscribe(me)
+
+    # No app/DB context is held while streaming; the connection just waits on the broker.
+    def stream():
+        yield f"retry: {keepalive * 1000}\n\n"
+        while True:
+            remaining = expires_at - time.time() if expires_at else keepalive
+            if remaining <= 0:
+                yield events.format_sse({"type": "expired", "data": {}})
+                return
+            event = subscription.get(timeout=min(keepalive, remaining))
+            yield events.format_sse(event) if event else ": keepalive\n\n"
+
+    def close():
+        # call_on_close also runs when the client drops before the first chunk
+        subscription.close()
+        events.stream_slots.release()
+
+    response = Response(stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # don't let nginx buffer the stream
+    })
+    response.call_on_close(close)
+    return response
+
+
+def publish_unread_count(user_id):
+    """Push `user_id`'s unread total to their open streams (after the commit that changed it)."""
+    events.publish(user_id, "unread", {"unread_count": unread_cache.get(user_id)})
+
+
 @bp.route("/messages/unread-count", methods=["GET"])
 @jwt_required()
 def unread_message_count():
-    me = get_jwt_identity()
-    count = Message.query.filter_by(recipient_id=me, read=False).count()
-    return jsonify({"unread_count": count}), 200
+    return jsonify({"unread_count": unread_cache.get(get_jwt_identity())}), 200
 
 
 @bp.route("/messages/inbox/search", methods=["GET"])
@@ -870,33 +1310,78 @@ def search_inbox():
     if not q:
         return jsonify({"error": "Missing search query"}), 400
 
-    messages = Message.query.filter(
-        db.or_(Message.sender_id == me, Message.recipient_id == me)
-    ).order_by(Message.sent_at.desc()).all()
+    # Each conversation is represented by its newest hit: the newest message
+    # whose text matches (full-text index), or its last message when the
+    # partner's handle/name matches (trigram indexes on users).
+    mine = db.or_(Message.sender_id == me, Message.recipient_id == me)
+    msg_other = db.case((Message.sender_id == me, Message.recipient_id), else_=Message.sender_id)
+    conv_other = db.case((Conversation.user_a_id == me, Conversation.user_b_id), else_=Conversation.user_a_id)
+
+    hit_queries = [
+        db.select(conv_other.label("other_id"), Conversation.last_message_id.label("hit_id"))
+        .join(User, User.user_id == conv_other)
+        .where(
+            db.or_(Conversation.user_a_id == me, Conversation.user_b_id == me),
+            Conversation.last_message_id.isnot(None),
+            db.or_(
+                User.handle.icontains(q, autoescape=True),
+                User.first_name.icontains(q, autoescape=True),
+                User.last_name.icontains(q, autoescape=True),
+            ),
+        )
+    ]
+    text_match = match_messages(q)
+    if text_match is not None:
+        hit_queries.append(
+            db.select(msg_other.label("other_id"), db.func.max(Message.message_id).label("hit_id"))
+            .where(mine, text_match)
+            .group_by(msg_other)
+        )
+    hits = db.union_all(*hit_queries).subquery()
+    best = (
+        db.select(hits.c.other_id, db.func.max(hits.c.hit_id).label("hit_id"))
+        .group_by(hits.c.other_id)
+        .subquery()
+    )
 
-    results, seen = [], set()
-    for msg in messages:
-        other = msg.recipient_id if msg.sender_id == me else msg.sender_id
-        key = tuple(sorted([me, other]))
-        if key in seen:
-            continue
+    query = (
+        db.session.query(best.c.other_id, User.handle, Message)
+        .join(Message, Message.message_id == best.c.hit_id)
+        .join(User, User.user_id == best.c.other_id)
+        .filter(not_blocked(me, best.c.other_id))
+        .order_by(best.c.hit_id.desc())
+    )
 
-        other_user = User.query.get(other)
-        match = (
-            (q in (msg.text or "").lower())
-            or (q in (other_user.first_name or "").lower())
-            or (q in (other_user.last_name or "").lower())
-            or (q in (other_user.handle or "").lower())
-        )
-        if match:
-            seen.add(key)
-            results.append({
-                "user_id": other,
-                "handle": other_user.handle,
-                "last_message": msg.text,
-                "timestamp": msg.sent_at.isoformat(),
-                "unread": (not msg.read and msg.recipient_id == me),
-            })
+    # Opt-in pagination, newest conversation first; the cursor is the last hit's message_id.
+    # Without it the plain list is still capped at one default-sized page.
+    paginate = wants_pagination()
+    next_cursor = None
+    limit = get_page_size()
+    if paginate:
+        cursor = request.args.get("cursor")
+        if cursor:
+            values = decode_cursor(cursor)
+            if not values or len(values) != 1 or not isinstance(values[0], int):
+                return jsonify({"error": "Invalid cursor"}), 400
+            query = query.filter(best.c.hit_id < values[0])
+        rows = query.limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].Message.message_id)
+    else:
+        rows = query.limit(limit).all()
+
+    results = [
+        {
+            "user_id": r.other_id,
+            "handle": r.handle,
+            "last_message": r.Message.text,
+            "timestamp": r.Message.sent_at.isoformat(),
+            "unread": (not r.Message.read and r.Message.recipient_id == me),
+        } for r in rows
+    ]
+    if paginate:
+        return jsonify({"conversations": results, "next_cursor": next_cursor})
     return jsonify(results)
 
 
@@ -915,6 +1400,7 @@ def pin_conversation(other_user_id):
         return jsonify({"message": "Already pinned"}), 200
 
     db.session.add(PinnedConversation(user_id=me, other_user_id=other_user_id))
+    conversations.set_pinned(me, other_user_id, True)
     db.session.commit()
     return jsonify({"message": "Conversation pinned"}), 201
 
@@ -927,6 +1413,7 @@ def unpin_conversation(other_user_id):
     if not pin:
         return jsonify({"error": "Pin not found"}), 404
     db.session.delete(pin)
+    conversations.set_pinned(me, other_user_id, False)
     db.session.commit()
     return jsonify({"message": "Conversation unpinned"}), 200
 
@@ -952,16 +1439,24 @@ def get_posts_by_user(user_id):
     viewer_id = get_jwt_identity()
     if viewer_id and is_blocked(viewer_id, user_id):
         return jsonify([])
-    posts = Post.query.filter_by(user_id=user_id).order_by(Post.created_at.desc()).all()
-    return jsonify([{**serialize_post(p), "user_handle": p.user.handle} for p in posts])
+    return stream_json_array(Post.query.filter_by(user_id=user_id).order_by(Post.created_at.desc()), serialize_posts)
 
 # =========================
 # Schools – details & join
 # =========================
 
 # === School detail (with chapters & stats) ===
+def school_page_viewer(school_id):
+    """Cache class for the school page: only is_member depends on who is asking."""
+    if not get_jwt_identity():
+        return "anon"
+    return "member" if viewer_school_id() == school_id else "user"
+
+
 @bp.route("/schools/<int:school_id>", methods=["GET"])
+@use_replica
 @jwt_required(optional=True)
+@cached(tags=lambda school_id: [f"school:{school_id}"], viewer=school_page_viewer)
 def get_school_detail(school_id):
     """
     Return a school's profile:
@@ -979,8 +1474,7 @@ def get_school_detail(school_id):
     # membership for current user
     is_member = False
     if user_id:
-        me = User.query.get(user_id)
-        is_member = (me is not None and me.school_id == school_id)
+        is_member = viewer_school_id() == school_id
 
     # stats
     member_count = User.query.filter_by(school_id=school_id).count()
@@ -1001,18 +1495,7 @@ def get_school_detail(school_id):
         .order_by(Post.created_at.desc())
         .limit(10)
     )
-    recent_posts = [
-        {
-            "post_id": p.post_id,
-            "title": p.title,
-            "type": p.type,
-            "price": float(p.price) if p.price is not None else None,
-            "created_at": p.created_at.isoformat(),
-            "user_handle": p.user.handle if p.user else None,
-            "image_url": p.images[0].url if p.images else None,
-        }
-        for p in recent_posts_q.all()
-    ]
+    recent_posts = serialize_post_summaries(recent_posts_q.all())
 
     return jsonify({
         "school": {
@@ -1035,8 +1518,9 @@ def get_school_detail(school_id):
 @jwt_required()
 def join_school(school_id):
     """Set the current user's school if not already set."""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = current_user()
+    if not user:
+        return jsonify({"error": "User not found"}), 404
     school = School.query.get(school_id)
 
     if not school:
@@ -1045,9 +1529,10 @@ def join_school(school_id):
     if user.school_id == school_id:
         return jsonify({"message": "Already a member of this school"}), 200
 
-    user.school_id = school_id
+    set_user_school(user, school_id)
     db.session.commit()
-    return jsonify({"message": "Joined school", "school_id": school_id}), 200
+    # school_id claim changed
+    return jsonify({"message": "Joined school", "school_id": school_id, "access_token": fresh_access_token(user)}), 200
 
 
 # -----------------------------------------------------------------------------
@@ -1056,13 +1541,12 @@ def join_school(school_id):
 @bp.route("/admin/remove-user", methods=["POST"])
 @jwt_required()
 def admin_remove_user():
-    admin_id = get_jwt_identity()
     data = request.get_json() or {}
     target_id = data.get("user_id")
     if not target_id:
         return jsonify({"error": "Missing user_id"}), 400
 
-    admin_membership = UserChapterMembership.query.filter_by(user_id=admin_id, role="admin").first()
+    admin_membership = current_admin_membership()
     if not admin_membership:
         return jsonify({"error": "Only chapter admins can remove users"}), 403
 
@@ -1073,6 +1557,7 @@ def admin_remove_user():
         return jsonify({"error": "User not found in your chapter"}), 404
 
     db.session.delete(membership)
+    chapter_members_changed(membership.chapter_id)
     db.session.commit()
     return jsonify({"message": "User removed from chapter"}), 200
 
@@ -1080,8 +1565,7 @@ def admin_remove_user():
 @bp.route("/admin/delete-post/<int:post_id>", methods=["DELETE"])
 @jwt_required()
 def delete_post(post_id):
-    me = get_jwt_identity()
-    admin_membership = UserChapterMembership.query.filter_by(user_id=me, role="admin").first()
+    admin_membership = current_admin_membership()
     if not admin_membership:
         return jsonify({"error": "Only chapter admins can delete posts"}), 403
 
@@ -1093,16 +1577,17 @@ def delete_post(post_id):
     if post.chapter_id != admin_membership.chapter_id:
         return jsonify({"error": "Post not found in your chapter"}), 404
 
+    invalidate_post_caches(post)
     db.session.delete(post)
     db.session.commit()
     return jsonify({"message": "Post deleted successfully"}), 200
 
 
 @bp.route("/admin/analytics", methods=["GET"])
+@use_replica
 @jwt_required()
 def chapter_analytics():
-    me = get_jwt_identity()
-    membership = UserChapterMembership.query.filter_by(user_id=me, role="admin").first()
+    membership = current_admin_membership()
     if not membership:
         return jsonify({"error": "Only chapter admins can view analytics"}), 403
 
@@ -1120,10 +1605,10 @@ def chapter_analytics():
 
 
 @bp.route("/admin/analytics/platform", methods=["GET"])
+@use_replica
 @jwt_required()
 def get_platform_analytics():
-    me = get_jwt_identity()
-    admin = UserChapterMembership.query.filter_by(user_id=me, role="admin").first()
+    admin = current_admin_membership()
     if not admin:
         return jsonify({"error": "Only chapter admins can view analytics"}), 403
 
@@ -1172,7 +1657,7 @@ def create_checkout_session():
     post_title = data.get("title")
 
     me = get_jwt_identity()
-    user = User.query.get(me)
+    user = current_user()
 
     if not user or not user.stripe_account_id:
         return jsonify({"error": "User must have a Stripe recipient account connected."}), 400
@@ -1201,8 +1686,7 @@ def create_checkout_session():
 @bp.route("/create-account-link", methods=["POST"])
 @jwt_required()
 def create_account_link():
-    me = get_jwt_identity()
-    user = User.query.get(me)
+    user = current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
 
@@ -1250,6 +1734,7 @@ def stripe_webhook():
                 post = Post.query.get(post_id)
                 if post:
                     post.is_sold = True
+                    invalidate_post_caches(post)
 
                 db.session.commit()
 
@@ -1260,25 +1745,10 @@ def stripe_webhook():
 @jwt_required()
 def get_my_purchases():
     me = get_jwt_identity()
-    purchases = Purchase.query.filter_by(buyer_id=me).order_by(Purchase.purchased_at.desc()).all()
-    results = []
-    for purchase in purchases:
-        post = purchase.post
-        if not post:
-            continue
-        seller = post.user
-        results.append({
-            "purchase_id": purchase.purchase_id,
-            "post_id": post.post_id,
-            "title": post.title,
-            "price": post.price,
-            "image_url": post.images[0].url if post.images else None,
-            "purchased_at": purchase.purchased_at.isoformat(),
-            "seller": {
-                "user_id": seller.user_id,
-                "first_name": seller.first_name,
-                "last_name": seller.last_name,
-                "handle": seller.handle,
-            },
-        })
-    return jsonify(results), 200
+    rows = (
+        db.session.query(Purchase, Post)
+        .join(Post, Post.post_id == Purchase.post_id)
+        .filter(Purchase.buyer_id == me)
+        .order_by(Purchase.purchased_at.desc())
+    )
+    return stream_json_array(rows, serialize_purchases)
@@ -0,0 +1,164 @@
+# app/search.py
+"""
+Full-text search over listings and direct messages.
+
+Postgres: posts.search_vector is a generated tsvector column (title weighted
+above description) with a GIN index, added by migration 3e8b6f0c9a21. Queries
+use prefix tsqueries ranked with ts_rank_cd. messages.search_vector works the
+same way over the message text (migration f3a8d61c2e47).
+
+SQLite (local dev): posts use an external-content FTS5 table, posts_fts,
+kept in sync by triggers and created on first use because migrations
+target Postgres. Messages are matched term by term with LIKE on the
+searching user's own rows: an FTS5 lookup there would match against every
+user's messages before the per-user filter applies.
+
+Any other dialect falls back to the old ILIKE scan so the endpoint still works.
+"""
+import re
+
+from . import db
+from .models import Post, Message
+
+_fts_ready = set()
+
+# Schema objects that live only in the database (not on the models);
+# hidden from autogenerate so it doesn't try to drop them.
+DB_ONLY_OBJECTS = {
+    "search_vector", "ix_posts_search_vector", "posts_fts",
+    "ix_messages_search_vector", "messages_fts",
+    "ix_users_handle_trgm", "ix_users_first_name_trgm",
+    "ix_users_last_name_trgm", "ix_users_email_trgm",
+}
+
+FTS_TRIGGER_SUFFIXES = ("ai", "ad", "au")  # <table>_ai / _ad / _au: after insert, delete, update
+RETIRED_FTS_TABLES = {"messages_fts"}  # created by earlier versions, dropped when found
+
+# Per FTS table: create it, its sync triggers, and index the existing rows
+SQLITE_FTS_DDL = {
+    "posts_fts": [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+            title, description, content='posts', content_rowid='post_id'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN
+            INSERT INTO posts_fts(rowid, title, description)
+            VALUES (new.post_id, new.title, new.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN
+            INSERT INTO posts_fts(posts_fts, rowid, title, description)
+            VALUES ('delete', old.post_id, old.title, old.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF title, description ON posts BEGIN
+            INSERT INTO posts_fts(posts_fts, rowid, title, description)
+            VALUES ('delete', old.post_id, old.title, old.description);
+            INSERT INTO posts_fts(rowid, title, description)
+            VALUES (new.post_id, new.title, new.description);
+        END""",
+        "INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')",
+    ],
+}
+
+
+def include_object(obj, name, type_, reflected, compare_to) -> bool:
+    return not (name in DB_ONLY_OBJECTS or (name or "").startswith(("posts_fts_", "messages_fts_")))
+
+
+def search_terms(q: str) -> list:
+    """Split a user query into plain word tokens (drops tsquery/FTS5 operators)."""
+    return re.findall(r"\w+", (q or "").lower())
+
+
+def ensure_sqlite_fts():
+    """
+    Create missing FTS5 tables and sync triggers, checked once per engine.
+    A table whose triggers are all present is left alone. If the table or
+    any of its triggers is missing (e.g. a batch migration recreated the
+    content table and dropped them), everything is recreated and the index
+    rebuilt, since writes made without the triggers never reached it.
+    """
+    engine = db.engine
+    if engine in _fts_ready:
+        return
+    with engine.begin() as conn:
+        existing = {
+            row[0] for row in conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE '%_fts%'"
+            )
+        }
+        for table, statements in SQLITE_FTS_DDL.items():
+            expected = {table} | {f"{table}_{suffix}" for suffix in FTS_TRIGGER_SUFFIXES}
+            if not expected <= existing:
+                for ddl in statements:
+                    conn.exec_driver_sql(ddl)
+        # messages_fts is no longer read; stop its triggers taxing every message write
+        for table in RETIRED_FTS_TABLES & existing:
+            for suffix in FTS_TRIGGER_SUFFIXES:
+                conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+    _fts_ready.add(engine)
+
+
+def rank_posts(query, q: str):
+    """
+    Restrict a Post query to full-text matches for `q`.
+
+    Returns a query of (Post, rank) rows, best match first, with post_id as
+    a tie-breaker so offsets are stable between pages. Returns None if `q`
+    has no searchable terms.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return None
+
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        vector = db.literal_column("posts.search_vector")
+        tsquery = db.func.to_tsquery("english", " & ".join(f"{t}:*" for t in terms))
+        rank = db.func.ts_rank_cd(vector, tsquery)
+        return (
+            query.add_columns(rank.label("rank"))
+            .filter(vector.op("@@")(tsquery))
+            .order_by(rank.desc(), Post.post_id.desc())
+        )
+
+    if dialect == "sqlite":
+        ensure_sqlite_fts()
+        fts = db.table("posts_fts", db.column("rowid"), db.column("rank"))
+        # bm25 rank: lower is better
+        return (
+            query.join(fts, fts.c.rowid == Post.post_id)
+            .add_columns((-fts.c.rank).label("rank"))
+            .filter(db.text("posts_fts MATCH :match"))
+            .params(match=" ".join(f'"{t}"*' for t in terms))
+            .order_by(fts.c.rank, Post.post_id.desc())
+        )
+
+    like = f"%{q}%"
+    return (
+        query.add_columns(db.literal(0.0).label("rank"))
+        .filter(db.or_(Post.title.ilike(like), Post.description.ilike(like)))
+        .order_by(Post.created_at.desc(), Post.post_id.desc())
+    )
+
+
+def match_messages(q: str):
+    """
+    WHERE criterion for messages whose text matches every term of `q` (as a
+    prefix; a substring on SQLite), or None if `q` has no searchable terms.
+    Callers narrow it to one user's messages; the planner combines it with the
+    sender/recipient indexes, so only that user's rows are tested.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return None
+
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        tsquery = db.func.to_tsquery("english", " & ".join(f"{t}:*" for t in terms))
+        return db.literal_column("messages.search_vector").op("@@")(tsquery)
+
+    if dialect == "sqlite":
+        # a row predicate like the tsvector one, tested only on the rows the caller's filter picks
+        return db.and_(*(Message.text.icontains(t, autoescape=True) for t in terms))
+
+    return Message.text.ilike(f"%{q}%")
@@ -0,0 +1,175 @@
+# app/sql_stats.py
+"""
+Per-request SQL instrumentation.
+
+Engine cursor events feed every active QueryStats: the one the current
+request owns, and any opened by count_queries() around a block of code.
+A QueryStats records the query count, total DB time, time spent waiting
+for a pooled connection (see app/db_pool.py), and how often each
+statement text repeated. Statements are parameterized, so a statement that
+repeats inside one request is almost always an N+1 (a lookup per row).
+
+Per request:
+  - debug / SQL_STATS_HEADERS: X-DB-Query-Count, X-DB-Time-Ms,
+    X-DB-Pool-Wait-Ms and Server-Timing entries on the response
+  - SQL_STATS_LOG: one structured (JSON) log line on the "app.sql" logger
+  - any statement run more than N_PLUS_ONE_THRESHOLD times logs a warning,
+    whatever the other settings
+
+In tests:
+
+    with assert_max_queries(3):
+        client.get("/posts/1")
+
+fails with the offending statements listed if the block ran more than 3
+queries or hit the N+1 threshold.
+"""
+import contextvars
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, request, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("app.sql")
+
+_active = contextvars.ContextVar("sql_stats_active", default=())
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.pool_wait = 0.0
+        self.statements = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[" ".join(statement.split())] += 1
+
+    def repeated(self, threshold: int) -> list:
+        """(statement, times) for statements run more than `threshold` times, most repeated first."""
+        return [(stmt, n) for stmt, n in self.statements.most_common() if n > threshold]
+
+    def summary(self, threshold: int) -> dict:
+        return {
+            "queries": self.count,
+            "db_ms": round(self.seconds * 1000, 2),
+            "pool_wait_ms": round(self.pool_wait * 1000, 2),
+            "repeated": [{"times": n, "statement": stmt[:300]} for stmt, n in self.repeated(threshold)],
+        }
+
+
+@contextmanager
+def count_queries():
+    """Collect QueryStats for everything run inside the block (in this thread/context)."""
+    stats = QueryStats()
+    token = _active.set(_active.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int, n_plus_one_threshold: int = None):
+    """Test helper: fail if the block runs more than `limit` queries or repeats a statement too often."""
+    threshold = n_plus_one_threshold
+    if threshold is None:
+        threshold = current_app.config["N_PLUS_ONE_THRESHOLD"]
+    with count_queries() as stats:
+        yield stats
+    problems = []
+    if stats.count > limit:
+        problems.append(f"{stats.count} queries (limit {limit})")
+    for stmt, n in stats.repeated(threshold):
+        problems.append(f"N+1: ran {n}x: {stmt}")
+    assert not problems, "\n".join(problems)
+
+
+def record_pool_wait(seconds: float):
+    """Called by the instrumented pool after each connection checkout."""
+    for stats in _active.get():
+        stats.pool_wait += seconds
+
+
+# -----------------------------------------------------------------------------
+# Engine events
+# -----------------------------------------------------------------------------
+# The start time lives on the statement's execution context, not the pooled connection:
+# a statement that fails never reaches after_cursor_execute, and its context is dropped with it.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active.get() and context is not None:
+        context.sql_stats_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    recorders = _active.get()
+    if not recorders:
+        return
+    started = getattr(context, "sql_stats_started", None)
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    for stats in recorders:
+        stats.record(statement, elapsed)
+
+
+# -----------------------------------------------------------------------------
+# Request hooks
+# -----------------------------------------------------------------------------
+def _start_request():
+    g.sql_stats = QueryStats()
+    g.sql_stats_token = _active.set(_active.get() + (g.sql_stats,))
+
+
+def _finish_request(response):
+    stats = g.get("sql_stats")
+    if stats is None:
+        return response
+
+    config = current_app.config
+    threshold = config["N_PLUS_ONE_THRESHOLD"]
+    summary = stats.summary(threshold)
+
+    if current_app.debug or config["SQL_STATS_HEADERS"]:
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-Ms"] = str(summary["db_ms"])
+        response.headers["X-DB-Pool-Wait-Ms"] = str(summary["pool_wait_ms"])
+        response.headers.add("Server-Timing", f'db;dur={summary["db_ms"]};desc="{stats.count} queries"')
+        response.headers.add("Server-Timing", f'db-pool;dur={summary["pool_wait_ms"]}')
+
+    if config["SQL_STATS_LOG"]:
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            **summary,
+        }))
+
+    for item in summary["repeated"]:
+        logger.warning(
+            "Possible N+1 in %s %s: statement ran %d times: %s",
+            request.method, request.path, item["times"], item["statement"],
+        )
+    return response
+
+
+def _stop_request(exc):
+    token = g.pop("sql_stats_token", None)
+    if token is not None:
+        _active.reset(token)
+    g.pop("sql_stats", None)
+
+
+def init_sql_stats(app):
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_stop_request)
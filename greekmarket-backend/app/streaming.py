@@ -0,0 +1,76 @@
+# app/streaming.py
+"""
+Streaming JSON arrays for list endpoints with no upper bound.
+
+    return stream_json_array(Post.query.filter_by(user_id=me), serialize_posts)
+
+The query runs with yield_per (a server-side cursor on Postgres). Rows are
+handed to `serialize_batch` JSON_STREAM_BATCH_SIZE at a time, so batch
+loaders like serialize_posts still cost a fixed number of queries per
+batch. Each batch is written out as soon as it is encoded. Memory is
+bounded by one batch whatever the row count, and the body is the same
+JSON array jsonify would have produced.
+
+If the client accepts gzip (and JSON_STREAM_GZIP is on), the stream is
+compressed here with a sync flush after each batch. A proxy in front
+sees Content-Encoding and passes it through. Without gzip, it is a
+plain chunked response.
+
+The request context, and with it the DB session, stays open until the
+last chunk is sent. SQL that runs during streaming isn't counted in the
+X-DB-* headers, which are sent before the body. If a query fails
+mid-stream, the status line is already out: the error is logged and the
+array is left unterminated, so clients see invalid JSON rather than a
+silently short list.
+"""
+import zlib
+from itertools import islice
+
+from flask import Response, current_app, request, stream_with_context
+
+
+def _json_chunks(rows, serialize_batch, batch_size):
+    dumps = current_app.json.dumps
+    rows = iter(rows)
+    yield "["
+    first = True
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        items = serialize_batch(batch)
+        if not items:
+            continue
+        body = dumps(items, separators=(",", ":"))[1:-1]  # one encoder call per batch, brackets dropped
+        yield body if first else "," + body
+        first = False
+    yield "]"
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _logged(chunks):
+    try:
+        yield from chunks
+    except Exception:
+        current_app.logger.exception("JSON stream for %s failed part-way", request.path)
+
+
+def stream_json_array(query, serialize_batch, batch_size: int = None) -> Response:
+    """Stream `query`'s rows as a JSON array. `serialize_batch` maps a list of rows to a list of dicts."""
+    config = current_app.config
+    batch_size = batch_size or config["JSON_STREAM_BATCH_SIZE"]
+    chunks = _logged(_json_chunks(query.yield_per(batch_size), serialize_batch, batch_size))
+
+    headers = {"Vary": "Accept-Encoding"}
+    if config["JSON_STREAM_GZIP"] and request.accept_encodings["gzip"]:
+        body = _gzipped(chunks)
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = (chunk.encode() for chunk in chunks)
+    return Response(stream_with_context(body), mimetype="application/json", headers=headers)
@@ -0,0 +1,161 @@
+# app/unread_counts.py
+"""
+Per-user unread message totals.
+
+users.unread_message_count is maintained next to the per-conversation
+counters in app/conversations.py. It goes up on send and down on read or
+delete, with SQL expressions in the same transaction as the Message write.
+GET /messages/unread-count reads it through a small process cache and never
+touches the messages table.
+
+The cache entry for a user is dropped when a transaction in this process
+that changed their count commits. Changes made by other workers show up
+once UNREAD_CACHE_TTL seconds pass. The cache holds at most
+UNREAD_CACHE_MAX_ENTRIES users and evicts the least recently read.
+
+Anything that bypasses the routes (manual SQL, a crash between statements
+in older code) can make the counter drift. A daemon thread per process
+recomputes drifted counters from the messages table every
+UNREAD_RECONCILE_INTERVAL seconds (jittered so workers don't line up).
+`flask reconcile-unread-counts` does the same on demand.
+"""
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+from . import db
+from .models import User, Message
+
+
+class UnreadCountCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user_id -> (count, monotonic expiry), least recently read first
+
+    def get(self, user_id: int) -> int:
+        user_id = int(user_id)
+        now = time.monotonic()
+        _ensure_reconciler()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                return entry[0]
+
+        count = (
+            db.session.query(User.unread_message_count)
+            .filter(User.user_id == user_id)
+            .scalar()
+        ) or 0
+        config = current_app.config
+        with self._lock:
+            self._entries[user_id] = (count, now + config["UNREAD_CACHE_TTL"])
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > config["UNREAD_CACHE_MAX_ENTRIES"]:
+                self._entries.popitem(last=False)
+        return count
+
+    def invalidate(self, user_ids=None):
+        """Drop the given users' entries, or everything when user_ids is None."""
+        with self._lock:
+            if user_ids is None:
+                self._entries.clear()
+            else:
+                for user_id in user_ids:
+                    self._entries.pop(int(user_id), None)
+
+
+unread_cache = UnreadCountCache()
+
+
+def adjust(user_id, delta: int):
+    """Stage `unread_message_count += delta` (floored at 0) on db.session."""
+    if not delta:
+        return
+    column = User.unread_message_count
+    value = column + delta if delta > 0 else db.case((column + delta > 0, column + delta), else_=0)
+    User.query.filter(User.user_id == int(user_id)).update({column: value}, synchronize_session=False)
+    db.session.info.setdefault("unread_count_users", set()).add(int(user_id))
+
+
+def reconcile() -> int:
+    """Recompute every drifted counter from the messages table; returns rows fixed."""
+    actual = (
+        db.select(db.func.count(Message.message_id))
+        .where(Message.recipient_id == User.user_id, Message.read == db.false())
+        .scalar_subquery()
+    )
+    fixed = (
+        User.query.filter(User.unread_message_count != actual)
+        .update({User.unread_message_count: actual}, synchronize_session=False)
+    )
+    db.session.commit()
+    unread_cache.invalidate()
+    return fixed
+
+
+_reconciler_lock = threading.Lock()
+_reconciler_pid = None
+
+
+def _ensure_reconciler():
+    """Start this process's reconcile thread; threads don't survive a fork, so a preloaded worker starts its own."""
+    global _reconciler_pid
+    pid = os.getpid()
+    if _reconciler_pid == pid or not current_app.config["UNREAD_RECONCILE_INTERVAL"]:
+        return
+    with _reconciler_lock:
+        if _reconciler_pid == pid:
+            return
+        _reconciler_pid = pid
+    app = current_app._get_current_object()
+    thread = threading.Thread(target=_reconcile_periodically, args=(app,), name="unread-reconcile", daemon=True)
+    thread.start()
+
+
+def _reconcile_periodically(app):
+    interval = app.config["UNREAD_RECONCILE_INTERVAL"]
+    while True:
+        time.sleep(interval * random.uniform(0.5, 1.5))
+        with app.app_context():
+            try:
+                fixed = reconcile()
+                if fixed:
+                    app.logger.warning("Reconciled unread counts: %d user(s) had drifted", fixed)
+            except Exception:
+                db.session.rollback()
+                app.logger.exception("Background unread count reconcile failed")
+
+
+@click.command("reconcile-unread-counts")
+@with_appcontext
+def reconcile_unread_counts_command():
+    """Fix users.unread_message_count wherever it drifted from the messages table."""
+    fixed = reconcile()
+    click.echo(f"Reconciled unread counts: {fixed} user(s) corrected.")
+
+
+# -----------------------------------------------------------------------------
+# Cache invalidation: collect touched users during the transaction, drop them on commit
+# -----------------------------------------------------------------------------
+def _invalidate_on_commit(session):
+    unread_cache.invalidate(session.info.pop("unread_count_users", ()))
+
+
+def _discard_on_rollback(session, *args):
+    session.info.pop("unread_count_users", None)
+
+
+def init_unread_counts(app):
+    if not event.contains(Session, "after_commit", _invalidate_on_commit):
+        event.listen(Session, "after_commit", _invalidate_on_commit)
+        event.listen(Session, "after_rollback", _discard_on_rollback)
+    app.cli.add_command(reconcile_unread_counts_command)
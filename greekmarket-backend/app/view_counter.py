@@ -0,0 +1,126 @@
+# app/view_counter.py
+"""
+Buffered post view counter.
+
+Views are counted in memory and written with one executemany UPDATE
+(views = views + delta) at most every VIEW_FLUSH_INTERVAL seconds. Hot
+listings stop serializing on a row lock for every GET. Repeat views of
+the same post by the same viewer within VIEW_DEDUPE_WINDOW seconds are
+dropped (0 disables dedupe). The dedupe memory holds at most
+VIEW_DEDUPE_MAX_ENTRIES viewer/post pairs; past that the oldest are
+forgotten early.
+
+Counts shown to users are the stored value plus whatever this process has
+buffered. A daemon thread per process flushes every VIEW_FLUSH_INTERVAL
+seconds, whether or not requests keep arriving. A last flush runs when the
+worker exits (gunicorn's worker_exit hook, then atexit). A SIGKILLed or
+timed-out worker loses at most one interval of views.
+
+Viewer keys for anonymous views are client IPs. Behind a proxy they come
+from X-Forwarded-For via ProxyFix once TRUSTED_PROXIES is set (off by default).
+"""
+import atexit
+import os
+import threading
+import time
+
+from flask import current_app
+
+from . import db
+from .models import Post
+
+
+class ViewCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}     # post_id -> buffered views
+        self._seen = {}        # (viewer_key, post_id) -> monotonic time of last counted view, oldest first
+        self._flusher_pid = None
+
+    def record(self, post_id: int, viewer_key=None) -> bool:
+        """Buffer one view; returns False if it was a duplicate within the dedupe window."""
+        config = current_app.config
+        window = config["VIEW_DEDUPE_WINDOW"]
+        now = time.monotonic()
+        self._ensure_flusher()
+        with self._lock:
+            if window and viewer_key is not None:
+                seen_key = (viewer_key, post_id)
+                last = self._seen.pop(seen_key, None)
+                if last is not None and now - last < window:
+                    self._seen[seen_key] = last
+                    return False
+                self._seen[seen_key] = now  # re-inserted, so the dict stays ordered by time
+                self._prune_seen(now, window, config["VIEW_DEDUPE_MAX_ENTRIES"])
+            self._pending[post_id] = self._pending.get(post_id, 0) + 1
+        return True
+
+    def _prune_seen(self, now, window, max_entries):
+        """Drop expired pairs from the old end, then the oldest ones past max_entries. Caller holds the lock."""
+        while self._seen:
+            key = next(iter(self._seen))
+            if now - self._seen[key] < window and len(self._seen) <= max_entries:
+                break
+            del self._seen[key]
+
+    def pending(self, post_id: int) -> int:
+        return self._pending.get(post_id, 0)
+
+    def _ensure_flusher(self):
+        """Start this process's flush thread; threads don't survive a fork, so a preloaded worker starts its own."""
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+        app = current_app._get_current_object()
+        thread = threading.Thread(target=self._flush_periodically, args=(app,), name="view-counter-flush", daemon=True)
+        thread.start()
+
+    def _flush_periodically(self, app):
+        interval = max(app.config["VIEW_FLUSH_INTERVAL"], 1)  # 0 or less would spin
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    self.flush()
+                except Exception:
+                    app.logger.exception("Background view counter flush failed")
+
+    def flush(self):
+        """Write buffered views in a single executemany; re-buffer them if the write fails."""
+        now = time.monotonic()
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            config = current_app.config
+            self._prune_seen(now, config["VIEW_DEDUPE_WINDOW"], config["VIEW_DEDUPE_MAX_ENTRIES"])
+        if not batch:
+            return
+
+        posts = Post.__table__
+        stmt = (
+            posts.update()
+            .where(posts.c.post_id == db.bindparam("pid"))
+            .values(views=posts.c.views + db.bindparam("delta"), updated_at=posts.c.updated_at)  # views aren't an edit
+        )
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(stmt, [{"pid": pid, "delta": n} for pid, n in batch.items()])
+        except Exception:
+            current_app.logger.exception("View counter flush failed; re-buffering %d posts", len(batch))
+            with self._lock:
+                for pid, n in batch.items():
+                    self._pending[pid] = self._pending.get(pid, 0) + n
+
+
+view_counter = ViewCounter()
+
+
+def init_view_counter(app):
+    def flush_on_exit():
+        with app.app_context():
+            view_counter.flush()
+
+    atexit.register(flush_on_exit)
@@ -0,0 +1,193 @@
+# bench.py
+"""
+Endpoint benchmark.
+
+Drives the Flask test client against every GET endpoint in app/routes.py
+(plus paginated variants) as one realistic user. For each one it reports
+p50/p95 latency, SQL queries per request and process RSS. It runs against
+whatever DATABASE_URL points at, local Postgres or SQLite; load data with
+seed_large.py first.
+
+The viewer is the user with the busiest inbox, so message endpoints work
+against a long history. Mutating endpoints are not driven: they would change
+the dataset between runs. The SSE stream never finishes and is skipped too.
+
+Run:  python bench.py                                 # table to stdout
+      python bench.py --only search --iterations 50
+      python bench.py --json baseline.json            # save a baseline
+      python bench.py --compare baseline.json         # exit 1 on p95/query-count regressions
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import time
+
+from app import create_app, db
+from app.models import Conversation, Message, Post, User, UserChapterMembership, Chapter
+from app.sql_stats import count_queries
+
+# Query strings for endpoints that need one, and extra paginated variants.
+EXTRA_CASES = {
+    "main.search_schools": ["q=state"],
+    "main.search_chapters": ["q=sig"],
+    "main.search_users": ["q=user1", "q=user1&limit=20"],
+    "main.search_posts": ["q=vintage", "q=vintage&limit=20"],
+    "main.search_inbox": ["q=hoodie", "q=hoodie&limit=20"],
+    "main.get_posts_for_school": ["", "limit=20", "limit=20&sort=price"],
+    "main.get_conversation": ["", "limit=50"],
+}
+SKIP = {"main.event_stream", "static"}
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux /proc), or the peak where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def pick_fixtures() -> dict:
+    """Ids for URL arguments: the busiest inbox user and things near them."""
+    busiest = (
+        db.session.query(Conversation.user_a_id, db.func.count())
+        .group_by(Conversation.user_a_id)
+        .order_by(db.func.count().desc())
+        .first()
+    )
+    viewer = db.session.get(User, busiest[0]) if busiest else User.query.first()
+    if viewer is None:
+        raise SystemExit("No users in the database; run seed_large.py first.")
+
+    conv = (
+        Conversation.query.filter(db.or_(Conversation.user_a_id == viewer.user_id, Conversation.user_b_id == viewer.user_id))
+        .order_by(Conversation.last_message_at.desc())
+        .first()
+    )
+    other_id = (conv.user_b_id if conv.user_a_id == viewer.user_id else conv.user_a_id) if conv else viewer.user_id
+    membership = UserChapterMembership.query.filter_by(user_id=viewer.user_id).first()
+    chapter_id = membership.chapter_id if membership else db.session.query(db.func.min(Chapter.chapter_id)).scalar()
+    post_id = (
+        db.session.query(db.func.max(Post.post_id)).filter(Post.school_id == viewer.school_id).scalar()
+        or db.session.query(db.func.max(Post.post_id)).scalar()
+    )
+    message_id = db.session.query(db.func.max(Message.message_id)).scalar()
+    return {
+        "viewer": viewer,
+        "args": {
+            "school_id": viewer.school_id,
+            "chapter_id": chapter_id,
+            "post_id": post_id,
+            "user_id": other_id,
+            "with_user_id": other_id,
+            "other_user_id": other_id,
+            "message_id": message_id,
+        },
+    }
+
+
+def build_cases(app, fixtures, only):
+    cases = []
+    for rule in app.url_map.iter_rules():
+        if "GET" not in rule.methods or rule.endpoint in SKIP:
+            continue
+        if only and only not in rule.endpoint and only not in rule.rule:
+            continue
+        path = rule.build({name: fixtures["args"][name] for name in rule.arguments}, append_unknown=False)[1]
+        for qs in EXTRA_CASES.get(rule.endpoint, [""]):
+            cases.append((rule.endpoint, f"{path}?{qs}" if qs else path))
+    return sorted(cases, key=lambda c: c[1])
+
+
+def run_case(client, url, headers, warmup, iterations) -> dict:
+    for _ in range(warmup):
+        client.get(url, headers=headers)
+    latencies, queries, status = [], [], None
+    for _ in range(iterations):
+        with count_queries() as stats:
+            started = time.perf_counter()
+            resp = client.get(url, headers=headers)
+            resp.get_data()
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(stats.count)
+        status = resp.status_code
+    return {
+        "status": status,
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "queries": int(statistics.median(queries)),
+        "rss_mb": round(rss_mb(), 1),
+    }
+
+
+def compare(results, baseline_path, tolerance) -> list:
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for url, r in results.items():
+        base = baseline.get(url)
+        if not base:
+            continue
+        if r["queries"] > base["queries"]:
+            regressions.append(f"{url}: queries {base['queries']} -> {r['queries']}")
+        if r["p95_ms"] > base["p95_ms"] * (1 + tolerance) and r["p95_ms"] - base["p95_ms"] > 1:
+            regressions.append(f"{url}: p95 {base['p95_ms']}ms -> {r['p95_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--only", help="Only endpoints whose name or path contains this")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --json run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95 slowdown vs the baseline")
+    opts = parser.parse_args()
+
+    app = create_app()
+    app.config["SQL_STATS_LOG"] = False
+    client = app.test_client()
+
+    with app.app_context():
+        from app.routes import fresh_access_token
+
+        fixtures = pick_fixtures()
+        viewer_id = fixtures["viewer"].user_id
+        headers = {"Authorization": f"Bearer {fresh_access_token(fixtures['viewer'])}"}
+        cases = build_cases(app, fixtures, opts.only)
+        engine_url = db.engine.url.render_as_string(hide_password=True)
+        db.session.remove()
+
+    print(f"Benchmarking {len(cases)} requests as user {viewer_id} against {engine_url}")
+    print(f"{'endpoint':<42} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} {'rss MB':>8}")
+    results = {}
+    for endpoint, url in cases:
+        r = run_case(client, url, headers, opts.warmup, opts.iterations)
+        results[url] = {"endpoint": endpoint, **r}
+        print(f"{url[:42]:<42} {r['status']:>6} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['queries']:>8} {r['rss_mb']:>8.1f}")
+
+    if opts.json:
+        with open(opts.json, "w") as f:
+            json.dump({"database": engine_url, "iterations": opts.iterations, "results": results}, f, indent=2)
+        print(f"Saved results to {opts.json}")
+
+    if opts.compare:
+        regressions = compare(results, opts.compare, opts.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"No regressions against {opts.compare}.")
+
+
+if __name__ == "__main__":
+    main()
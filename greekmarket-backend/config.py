@@ -7,10 +7,102 @@ load_dotenv()
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool, per worker process (app/db_pool.py builds SQLALCHEMY_ENGINE_OPTIONS).
+    # Keep workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) under the server's max_connections.
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; -1 = never
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"  # drop dead connections before use
+    DB_POOL_USE_LIFO = os.getenv("DB_POOL_USE_LIFO", "1") == "1"  # reuse hot connections; idle ones age out
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # Postgres; 0 = no limit
+    # PgBouncer transaction pooling: no session state, no server-side prepared statements
+    DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "0") == "1"
+
+    # Read replicas (app/replicas.py): comma-separated URLs, one bind each
+    DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+    DB_READ_ROUTING = os.getenv("DB_READ_ROUTING", "decorator")  # decorator | method | off
+    DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", "10"))  # primary-only after a write
+
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # enables /internal/metrics/db-pool
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'super-secret-key')
     STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
     STRIPE_PUBLISHABLE_KEY = os.getenv("STRIPE_PUBLISHABLE_KEY")
 
+    # In-memory chapter/school name index: full reload after this many seconds
+    # (picks up writes made by other worker processes)
+    NAME_INDEX_TTL = int(os.getenv("NAME_INDEX_TTL", "300"))
+
+    # Post views are buffered in memory and flushed in batches
+    VIEW_FLUSH_INTERVAL = int(os.getenv("VIEW_FLUSH_INTERVAL", "10"))  # seconds; at least 1
+    VIEW_DEDUPE_WINDOW = int(os.getenv("VIEW_DEDUPE_WINDOW", "1800"))  # seconds; 0 = count every view
+    VIEW_DEDUPE_MAX_ENTRIES = int(os.getenv("VIEW_DEDUPE_MAX_ENTRIES", "100000"))  # viewer/post pairs per process
+    # Reverse proxies in front of the app whose X-Forwarded-For/-Proto are trusted (ProxyFix), so
+    # request.remote_addr is the client (view dedupe keys on it). Off by default: with no proxy in
+    # front, clients could forge the header. Set to the number of proxy hops behind a known proxy.
+    TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "0"))
+
+    # Per-user unread totals are cached per process; other workers' writes show up after this
+    UNREAD_CACHE_TTL = int(os.getenv("UNREAD_CACHE_TTL", "10"))  # seconds
+    UNREAD_CACHE_MAX_ENTRIES = int(os.getenv("UNREAD_CACHE_MAX_ENTRIES", "10000"))  # users, per process (LRU)
+    # Each worker recomputes drifted users.unread_message_count from messages this often; 0 = off
+    UNREAD_RECONCILE_INTERVAL = int(os.getenv("UNREAD_RECONCILE_INTERVAL", "3600"))  # seconds
+
+    # Response cache for anonymous GETs (app/response_cache.py). CACHE_BACKEND: memory | redis | none
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+    CACHE_DEFAULT_TTL = int(os.getenv("CACHE_DEFAULT_TTL", "30"))  # seconds; also bounds cross-worker staleness
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))  # memory backend, per process
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/1")  # fakeredis:// for a local stand-in
+    CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "greekvault:rc:")
+    # Concurrent misses for one entry share a computation: process | shared (lock in the backend) | off
+    CACHE_COALESCE = os.getenv("CACHE_COALESCE", "process")
+    CACHE_COALESCE_WAIT = float(os.getenv("CACHE_COALESCE_WAIT", "5"))  # seconds a waiter holds on
+
+    # Realtime events (SSE). Empty broker URL = in-process fan-out (single worker);
+    # redis://host:port/0 fans out across workers.
+    EVENT_BROKER_URL = os.getenv("EVENT_BROKER_URL")
+    SSE_KEEPALIVE = int(os.getenv("SSE_KEEPALIVE", "15"))  # seconds between keepalive comments
+
+    # Unbounded list endpoints stream their JSON arrays (app/streaming.py)
+    JSON_STREAM_BATCH_SIZE = int(os.getenv("JSON_STREAM_BATCH_SIZE", "500"))  # rows fetched/encoded per chunk
+    JSON_STREAM_GZIP = os.getenv("JSON_STREAM_GZIP", "1") == "1"  # compress when the client accepts gzip
+
+    # Password hashing: algorithm (bcrypt | scrypt | pbkdf2) and cost for new hashes;
+    # 0 = the algorithm's default. Hashes made with other settings upgrade on login.
+    PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "bcrypt")
+    PASSWORD_HASH_COST = int(os.getenv("PASSWORD_HASH_COST", "0"))
+    # Hashing runs in a process pool of this size (0 = inline, on the request thread)
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE_FACTOR = 8  # max pending hashes per pool worker
+    PASSWORD_HASH_WAIT = 5  # seconds to wait for a queue slot before answering 503
+
+    # SQL instrumentation (app/sql_stats.py): per-request query count / DB time.
+    # Headers are always on in debug; logs are one JSON line per request.
+    SQL_STATS_HEADERS = os.getenv("SQL_STATS_HEADERS", "0") == "1"
+    SQL_STATS_LOG = os.getenv("SQL_STATS_LOG", "1") == "1"
+    N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))  # warn when a statement repeats more often
+
+    # Production server (gunicorn.conf.py). WEB_WORKER_CLASS: sync | gthread | gevent.
+    # SSE streams hold a connection open (see SSE_MAX_STREAMS below), so use gthread or gevent with them.
+    WEB_BIND = os.getenv("WEB_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+    WEB_WORKER_CLASS = os.getenv("WEB_WORKER_CLASS", "gthread")
+    WEB_WORKERS = int(os.getenv("WEB_WORKERS", "0"))  # 0 = derived from CPU count and worker class
+    WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))  # gthread: threads per worker
+    WEB_WORKER_CONNECTIONS = int(os.getenv("WEB_WORKER_CONNECTIONS", "500"))  # gevent: greenlets per worker
+    # Open SSE streams per worker; past this /events/stream answers 503 + Retry-After. Each stream pins
+    # a gthread thread (a whole sync worker), so size WEB_THREADS = streams per worker + threads for
+    # regular requests. Default keeps half the threads free; sync gets none; gevent greenlets are cheap.
+    SSE_MAX_STREAMS = int(os.getenv("SSE_MAX_STREAMS", str(
+        {"sync": 0, "gevent": max(WEB_WORKER_CONNECTIONS - 100, 1)}.get(WEB_WORKER_CLASS, WEB_THREADS // 2)
+    )))
+    WEB_PRELOAD_APP = os.getenv("WEB_PRELOAD_APP", "1") == "1"
+    WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", "2000"))  # recycle a worker after this many requests
+    WEB_MAX_REQUESTS_JITTER = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "200"))
+    WEB_KEEPALIVE = int(os.getenv("WEB_KEEPALIVE", "5"))  # seconds; keep above 0 behind a load balancer
+    WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", "30"))
+    WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+
     # Tokens: short access, long refresh
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=15)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
@@ -0,0 +1,99 @@
+# gunicorn.conf.py
+"""
+gunicorn settings, driven by the WEB_* values on Config (config.py).
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Worker classes:
+  - sync:    one request per process. Workers = 2 x CPU + 1. Lowest overhead
+             for short DB-bound requests. Can't hold SSE streams.
+  - gthread: WEB_THREADS threads per process. Workers = CPU + 1. Default;
+             tolerates slow clients. Each SSE stream pins a thread, so a
+             worker admits SSE_MAX_STREAMS (default WEB_THREADS / 2) and
+             sheds the rest with 503.
+  - gevent:  WEB_WORKER_CONNECTIONS greenlets per process. Workers = CPU.
+             Best for many idle connections (SSE). Needs `gevent`, and
+             `psycogreen` so psycopg2 yields to other greenlets.
+
+SSE fan-out across processes needs EVENT_BROKER_URL. Without it events only
+reach streams in the publishing worker, so the worker count defaults to 1
+(logged as a warning at startup) and an explicit WEB_WORKERS > 1 refuses to
+start. The access log leaves out query strings, which can carry a JWT.
+
+The app is preloaded in the master (one import, shared copy-on-write pages).
+Each worker then gets fresh DB connections in post_fork, and workers are
+recycled after WEB_MAX_REQUESTS (+ jitter) to cap memory creep. Measured
+throughput per worker class is in README.md.
+"""
+import multiprocessing
+
+from config import Config
+
+if Config.WEB_WORKER_CLASS == "gevent":
+    # Patch before the preloaded app imports ssl/socket/threading
+    from gevent import monkey
+
+    monkey.patch_all()
+    try:
+        from psycogreen.gevent import patch_psycopg  # optional: lets psycopg2 yield to other greenlets
+        patch_psycopg()
+    except ImportError:
+        pass
+
+_cores = multiprocessing.cpu_count()
+_default_workers = {"sync": 2 * _cores + 1, "gthread": _cores + 1, "gevent": _cores}
+
+bind = Config.WEB_BIND
+worker_class = Config.WEB_WORKER_CLASS
+# Without EVENT_BROKER_URL, SSE events only reach streams in the publishing process
+_in_process_broker = not Config.EVENT_BROKER_URL
+workers = Config.WEB_WORKERS or (1 if _in_process_broker else _default_workers.get(worker_class, _cores + 1))
+threads = Config.WEB_THREADS if worker_class == "gthread" else 1
+worker_connections = Config.WEB_WORKER_CONNECTIONS
+preload_app = Config.WEB_PRELOAD_APP
+max_requests = Config.WEB_MAX_REQUESTS
+max_requests_jitter = Config.WEB_MAX_REQUESTS_JITTER
+keepalive = Config.WEB_KEEPALIVE
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT
+accesslog = "-"
+# gunicorn's default format minus the query string: /events/stream carries the JWT in ?jwt=
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+errorlog = "-"
+
+
+def when_ready(server):
+    if not _in_process_broker:
+        return
+    if server.num_workers > 1:
+        # gunicorn prints the RuntimeError and exits 1
+        raise RuntimeError(
+            f"{server.num_workers} workers without EVENT_BROKER_URL: realtime events would only reach "
+            "SSE streams in the worker that published them. Set EVENT_BROKER_URL=redis://... or WEB_WORKERS=1."
+        )
+    server.log.warning(
+        "EVENT_BROKER_URL is not set, so running a single worker (the CPU-based default would be %d). "
+        "Set EVENT_BROKER_URL=redis://... to scale out.",
+        _default_workers.get(worker_class, _cores + 1),
+    )
+
+
+def post_fork(server, worker):
+    """Drop DB connections inherited from the master; each worker opens its own."""
+    if preload_app:
+        from wsgi import app
+        from app import db
+
+        with app.app_context():
+            # close=False: leave the master's sockets alone, just forget them in this process
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    """Write the worker's buffered post views before it goes (recycling, HUP, shutdown)."""
+    from wsgi import app
+    from app.view_counter import view_counter
+
+    with app.app_context():
+        view_counter.flush()
@@ -0,0 +1,39 @@
+"""Add generated tsvector + GIN index for post search
+
+Revision ID: 3e8b6f0c9a21
+Revises: 9c4e1a7d2b35
+Create Date: 2026-10-16 11:03:17.554902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e8b6f0c9a21'
+down_revision = '9c4e1a7d2b35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Postgres only; SQLite dev databases get an FTS5 table at runtime (app/search.py)
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("""
+        ALTER TABLE posts ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED
+    """)
+    op.create_index('ix_posts_search_vector', 'posts', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_posts_search_vector', table_name='posts')
+    op.drop_column('posts', 'search_vector')
@@ -0,0 +1,66 @@
+"""Add composite/partial indexes for hot query paths
+
+Revision ID: 9c4e1a7d2b35
+Revises: 52dc7775feca
+Create Date: 2026-10-16 10:12:41.208316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e1a7d2b35'
+down_revision = '52dc7775feca'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.create_index('ix_posts_school_id_created_at', ['school_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_posts_chapter_id_created_at', ['chapter_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_posts_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('post_images', schema=None) as batch_op:
+        batch_op.create_index('ix_post_images_post_id', ['post_id', 'image_id'], unique=False)
+
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.create_index('ix_comments_post_id_created_at', ['post_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('favorites', schema=None) as batch_op:
+        batch_op.create_index('ix_favorites_post_id', ['post_id'], unique=False)
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.create_index('ix_messages_sender_id_recipient_id_sent_at', ['sender_id', 'recipient_id', 'sent_at'], unique=False)
+        batch_op.create_index(
+            'ix_messages_recipient_id_unread', ['recipient_id', 'sender_id'], unique=False,
+            postgresql_where=sa.text('read = false'),
+            sqlite_where=sa.text('read = 0'),
+        )
+
+    with op.batch_alter_table('blocked_users', schema=None) as batch_op:
+        batch_op.create_index('ix_blocked_users_blocked_user_id', ['blocked_user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('blocked_users', schema=None) as batch_op:
+        batch_op.drop_index('ix_blocked_users_blocked_user_id')
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_messages_recipient_id_unread')
+        batch_op.drop_index('ix_messages_sender_id_recipient_id_sent_at')
+
+    with op.batch_alter_table('favorites', schema=None) as batch_op:
+        batch_op.drop_index('ix_favorites_post_id')
+
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_index('ix_comments_post_id_created_at')
+
+    with op.batch_alter_table('post_images', schema=None) as batch_op:
+        batch_op.drop_index('ix_post_images_post_id')
+
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_index('ix_posts_user_id_created_at')
+        batch_op.drop_index('ix_posts_chapter_id_created_at')
+        batch_op.drop_index('ix_posts_school_id_created_at')
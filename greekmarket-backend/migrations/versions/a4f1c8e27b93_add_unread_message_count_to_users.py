@@ -0,0 +1,33 @@
+"""Add maintained unread message total to users
+
+Revision ID: a4f1c8e27b93
+Revises: f3a8d61c2e47
+Create Date: 2026-10-16 15:48:31.207754
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f1c8e27b93'
+down_revision = 'f3a8d61c2e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unread_message_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute("""
+        UPDATE users SET unread_message_count = (
+            SELECT count(*) FROM messages m
+             WHERE m.recipient_id = users.user_id AND m.read = false
+        )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('unread_message_count')
@@ -0,0 +1,39 @@
+"""Add pg_trgm indexes for user search
+
+Revision ID: b71d2e94c0f6
+Revises: 3e8b6f0c9a21
+Create Date: 2026-10-16 11:48:02.913377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71d2e94c0f6'
+down_revision = '3e8b6f0c9a21'
+branch_labels = None
+depends_on = None
+
+SEARCH_COLUMNS = ['handle', 'first_name', 'last_name', 'email']
+
+
+def upgrade():
+    # Trigram GIN indexes let ILIKE '%q%' / 'q%' use an index; Postgres only.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in SEARCH_COLUMNS:
+        op.create_index(
+            f'ix_users_{column}_trgm', 'users', [column], unique=False,
+            postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for column in SEARCH_COLUMNS:
+        op.drop_index(f'ix_users_{column}_trgm', table_name='users')
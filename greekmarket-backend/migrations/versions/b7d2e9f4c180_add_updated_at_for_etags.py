@@ -0,0 +1,32 @@
+"""Add updated_at to schools, chapters and posts
+
+Revision ID: b7d2e9f4c180
+Revises: a4f1c8e27b93
+Create Date: 2026-10-16 18:02:47.553120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e9f4c180'
+down_revision = 'a4f1c8e27b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('schools', 'chapters', 'posts'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False))
+
+    # Existing rows start at their creation time (schools have none, so they keep "now")
+    op.execute("UPDATE chapters SET updated_at = created_at WHERE created_at IS NOT NULL")
+    op.execute("UPDATE posts SET updated_at = created_at WHERE created_at IS NOT NULL")
+
+
+def downgrade():
+    for table in ('posts', 'chapters', 'schools'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
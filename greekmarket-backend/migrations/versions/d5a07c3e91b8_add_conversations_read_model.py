@@ -0,0 +1,72 @@
+"""Add conversations inbox read model
+
+Revision ID: d5a07c3e91b8
+Revises: b71d2e94c0f6
+Create Date: 2026-10-16 13:21:40.117623
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a07c3e91b8'
+down_revision = 'b71d2e94c0f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('conversations',
+    sa.Column('conversation_id', sa.Integer(), nullable=False),
+    sa.Column('user_a_id', sa.Integer(), nullable=False),
+    sa.Column('user_b_id', sa.Integer(), nullable=False),
+    sa.Column('last_message_id', sa.Integer(), nullable=True),
+    sa.Column('last_sender_id', sa.Integer(), nullable=True),
+    sa.Column('last_message_text', sa.Text(), nullable=True),
+    sa.Column('last_message_at', sa.DateTime(), nullable=True),
+    sa.Column('unread_a', sa.Integer(), nullable=False),
+    sa.Column('unread_b', sa.Integer(), nullable=False),
+    sa.Column('pinned_a', sa.Boolean(), nullable=False),
+    sa.Column('pinned_b', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['user_a_id'], ['users.user_id'], ),
+    sa.ForeignKeyConstraint(['user_b_id'], ['users.user_id'], ),
+    sa.PrimaryKeyConstraint('conversation_id'),
+    sa.UniqueConstraint('user_a_id', 'user_b_id', name='uq_conversation_pair')
+    )
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.create_index('ix_conversations_user_a_id_last_message_at', ['user_a_id', 'last_message_at'], unique=False)
+        batch_op.create_index('ix_conversations_user_b_id_last_message_at', ['user_b_id', 'last_message_at'], unique=False)
+
+    # Backfill one row per user pair from existing messages; the newest message_id wins.
+    op.execute("""
+        INSERT INTO conversations (
+            user_a_id, user_b_id, last_message_id, last_sender_id, last_message_text,
+            last_message_at, unread_a, unread_b, pinned_a, pinned_b
+        )
+        SELECT p.a, p.b, m.message_id, m.sender_id, m.text, m.sent_at,
+            (SELECT count(*) FROM messages u
+              WHERE u.recipient_id = p.a AND u.sender_id = p.b AND u.read = false),
+            (SELECT count(*) FROM messages u
+              WHERE u.recipient_id = p.b AND u.sender_id = p.a AND u.read = false),
+            EXISTS (SELECT 1 FROM pinned_conversations pc
+                     WHERE pc.user_id = p.a AND pc.other_user_id = p.b),
+            EXISTS (SELECT 1 FROM pinned_conversations pc
+                     WHERE pc.user_id = p.b AND pc.other_user_id = p.a)
+        FROM (
+            SELECT CASE WHEN sender_id < recipient_id THEN sender_id ELSE recipient_id END AS a,
+                   CASE WHEN sender_id < recipient_id THEN recipient_id ELSE sender_id END AS b,
+                   max(message_id) AS last_id
+            FROM messages
+            GROUP BY 1, 2
+        ) p
+        JOIN messages m ON m.message_id = p.last_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.drop_index('ix_conversations_user_b_id_last_message_at')
+        batch_op.drop_index('ix_conversations_user_a_id_last_message_at')
+
+    op.drop_table('conversations')
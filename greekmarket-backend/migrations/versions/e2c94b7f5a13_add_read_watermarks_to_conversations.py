@@ -0,0 +1,41 @@
+"""Add per-side read watermarks to conversations
+
+Revision ID: e2c94b7f5a13
+Revises: d5a07c3e91b8
+Create Date: 2026-10-16 14:40:55.302117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2c94b7f5a13'
+down_revision = 'd5a07c3e91b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_read_id_a', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('last_read_id_b', sa.Integer(), nullable=True))
+
+    # Watermark = newest message each side has already read
+    op.execute("""
+        UPDATE conversations SET
+            last_read_id_a = (SELECT max(m.message_id) FROM messages m
+                               WHERE m.sender_id = conversations.user_b_id
+                                 AND m.recipient_id = conversations.user_a_id
+                                 AND m.read = true),
+            last_read_id_b = (SELECT max(m.message_id) FROM messages m
+                               WHERE m.sender_id = conversations.user_a_id
+                                 AND m.recipient_id = conversations.user_b_id
+                                 AND m.read = true)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.drop_column('last_read_id_b')
+        batch_op.drop_column('last_read_id_a')
@@ -0,0 +1,36 @@
+"""Add generated tsvector + GIN index for message search
+
+Revision ID: f3a8d61c2e47
+Revises: e2c94b7f5a13
+Create Date: 2026-10-16 15:12:08.640391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a8d61c2e47'
+down_revision = 'e2c94b7f5a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Postgres only; SQLite dev databases get an FTS5 table at runtime (app/search.py)
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute("""
+        ALTER TABLE messages ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(text, ''))) STORED
+    """)
+    op.create_index('ix_messages_search_vector', 'messages', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_messages_search_vector', table_name='messages')
+    op.drop_column('messages', 'search_vector')
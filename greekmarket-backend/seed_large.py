@@ -0,0 +1,287 @@
+# seed_large.py
+"""
+Synthetic large dataset for load testing and bench.py.
+
+Bulk-loads schools, chapters, users, memberships, posts (with images,
+comments, favorites), blocks, and messages along with their conversations
+rows and unread counters. Postgres is loaded with COPY, other databases with
+batched executemany INSERTs. Rows are appended after the current max ids, so
+it can run on top of seed.py data. Output is deterministic for a given --seed.
+
+Every generated user's password is "password123".
+
+Run:  python seed_large.py --preset small             # quick local SQLite run
+      python seed_large.py --preset large             # thousands of schools, millions of messages
+      python seed_large.py --schools 500 --posts 50000 --messages 200000
+      DATABASE_URL=sqlite:///bench.db python seed_large.py --preset small --create-tables
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta
+
+from app import create_app, db
+from app.models import (
+    School, Chapter, User, UserChapterMembership, Post, PostImage, Comment,
+    Favorite, Message, Conversation, BlockedUser,
+)
+from app.passwords import _hash
+from app import search, unread_counts
+from seed import FRATERNITIES, SORORITIES
+
+
+PRESETS = {
+    "small": dict(schools=50, users=5_000, posts=20_000, comments=20_000, favorites=20_000,
+                  conversations=5_000, messages=100_000, blocks=200),
+    "medium": dict(schools=500, users=50_000, posts=100_000, comments=150_000, favorites=200_000,
+                   conversations=50_000, messages=1_000_000, blocks=2_000),
+    "large": dict(schools=3_000, users=250_000, posts=400_000, comments=600_000, favorites=1_000_000,
+                  conversations=300_000, messages=5_000_000, blocks=10_000),
+}
+
+WORDS = (
+    "vintage rush shirt hoodie formal dress tickets tailgate jersey crewneck sticker cooler "
+    "paddle canvas koozie tank quarter zip bid day merch lettered sweatshirt sorority fraternity "
+    "philanthropy semi date party retreat banner custom painted pastel navy gold crimson garnet "
+    "sizes small medium large xl new barely worn pickup campus library ride split sublease"
+).split()
+POST_TYPES = ["apparel", "tickets", "furniture", "books", "services", "other"]
+FIRST_NAMES = "Ava Liam Emma Noah Mia Ethan Zoe Lucas Chloe Mason Lily Logan Grace Jack Ella Owen".split()
+LAST_NAMES = "Smith Johnson Brown Garcia Miller Davis Wilson Moore Taylor Clark Lewis Walker Hall".split()
+STATES = "Florida Georgia Texas Ohio Alabama Carolina Virginia Michigan Oregon Arizona Kansas Iowa".split()
+
+
+def sentence(rng, lo, hi):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(lo, hi)))
+
+
+# -----------------------------------------------------------------------------
+# Bulk loading
+# -----------------------------------------------------------------------------
+def csv_value(value):
+    if value is None:
+        return None  # written as an unquoted empty field, which COPY reads as NULL
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+
+class Loader:
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.postgres = db.engine.dialect.name == "postgresql"
+
+    def next_id(self, column) -> int:
+        return (db.session.query(db.func.max(column)).scalar() or 0) + 1
+
+    def load(self, model, columns, rows) -> int:
+        """Insert an iterable of row tuples (in `columns` order) in batches; returns the row count."""
+        table = model.__table__
+        started, total, batch = time.perf_counter(), 0, []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                total += self._flush(table, columns, batch)
+                batch = []
+        if batch:
+            total += self._flush(table, columns, batch)
+        print(f"✅ {table.name}: {total:,} rows in {time.perf_counter() - started:.1f}s")
+        return total
+
+    def _flush(self, table, columns, batch) -> int:
+        if self.postgres:
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            for row in batch:
+                writer.writerow([csv_value(v) for v in row])
+            buf.seek(0)
+            raw = db.engine.raw_connection()
+            try:
+                with raw.cursor() as cur:
+                    cur.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+                raw.commit()
+            finally:
+                raw.close()
+        else:
+            with db.engine.begin() as conn:
+                conn.execute(table.insert(), [dict(zip(columns, row)) for row in batch])
+        return len(batch)
+
+    def fix_sequences(self, *pk_columns):
+        """Postgres: move serial sequences past the explicitly inserted ids."""
+        if not self.postgres:
+            return
+        with db.engine.begin() as conn:
+            for column in pk_columns:
+                table, name = column.table.name, column.name
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', '{name}'), "
+                    f"(SELECT coalesce(max({name}), 1) FROM {table}))"
+                )
+
+
+# -----------------------------------------------------------------------------
+# Generation
+# -----------------------------------------------------------------------------
+def generate(opts):
+    rng = random.Random(opts.seed)
+    loader = Loader(opts.batch_size)
+    now = datetime.utcnow()
+
+    # Schools + chapters
+    first_school = loader.next_id(School.school_id)
+    school_ids = list(range(first_school, first_school + opts.schools))
+    loader.load(School, ["school_id", "name", "domain"], (
+        (sid, f"{rng.choice(STATES)} {rng.choice(['State', 'Tech', 'A&M', 'Central'])} University {sid}", f"school{sid}.edu")
+        for sid in school_ids
+    ))
+
+    chapter_names = [(n, "Fraternity") for n in FRATERNITIES] + [(n, "Sorority") for n in SORORITIES]
+    chapters_by_school, chapter_rows = {}, []
+    next_chapter = loader.next_id(Chapter.chapter_id)
+    for sid in school_ids:
+        for name, type_ in rng.sample(chapter_names, min(opts.chapters_per_school, len(chapter_names))):
+            chapters_by_school.setdefault(sid, []).append(next_chapter)
+            chapter_rows.append((next_chapter, sid, name, type_, True, now))
+            next_chapter += 1
+    loader.load(Chapter, ["chapter_id", "school_id", "name", "type", "verified", "created_at"], chapter_rows)
+
+    # Users + memberships
+    password_hash = _hash("password123", "bcrypt", 4)
+    first_user = loader.next_id(User.user_id)
+    user_ids = list(range(first_user, first_user + opts.users))
+    user_school = {uid: rng.choice(school_ids) for uid in user_ids}
+    loader.load(User, ["user_id", "first_name", "last_name", "email", "handle", "password_hash", "school_id", "created_at"], (
+        (uid, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f"user{uid}@school{user_school[uid]}.edu",
+         f"user{uid}", password_hash, user_school[uid], now - timedelta(days=rng.randint(0, 730)))
+        for uid in user_ids
+    ))
+
+    user_chapter = {}
+    for uid in user_ids:
+        chapters = chapters_by_school.get(user_school[uid])
+        if chapters and rng.random() < 0.6:
+            user_chapter[uid] = rng.choice(chapters)
+    loader.load(UserChapterMembership, ["user_id", "chapter_id", "role", "joined_at"], (
+        (uid, cid, "admin" if rng.random() < 0.02 else "member", now) for uid, cid in user_chapter.items()
+    ))
+
+    # Posts, images, comments, favorites
+    first_post = loader.next_id(Post.post_id)
+    post_ids = range(first_post, first_post + opts.posts)
+
+    def post_rows():
+        for pid in post_ids:
+            uid = rng.choice(user_ids)
+            chapter_id = user_chapter.get(uid) if rng.random() < 0.3 else None
+            visibility = rng.choices(["public", "school", "chapter"], [70, 20, 10])[0]
+            if visibility == "chapter" and chapter_id is None:
+                visibility = "school"
+            yield (
+                pid, uid, user_school[uid], chapter_id, rng.choice(POST_TYPES), sentence(rng, 2, 6).title(),
+                sentence(rng, 8, 30), None if rng.random() < 0.1 else round(rng.uniform(5, 300), 2),
+                rng.randint(0, 500), now - timedelta(minutes=rng.randint(0, 525_600)), rng.random() < 0.1, visibility,
+            )
+    loader.load(Post, ["post_id", "user_id", "school_id", "chapter_id", "type", "title", "description",
+                       "price", "views", "created_at", "is_sold", "visibility"], post_rows())
+
+    loader.load(PostImage, ["post_id", "url", "uploaded_at"], (
+        (pid, f"https://res.cloudinary.com/demo/image/upload/post{pid}_{i}.jpg", now)
+        for pid in post_ids for i in range(rng.randint(1, 3))
+    ))
+    loader.load(Comment, ["post_id", "user_id", "text", "created_at"], (
+        (rng.choice(post_ids), rng.choice(user_ids), sentence(rng, 3, 15), now - timedelta(minutes=rng.randint(0, 525_600)))
+        for _ in range(opts.comments)
+    ))
+    favorites = {(rng.choice(user_ids), rng.choice(post_ids)) for _ in range(opts.favorites)}
+    loader.load(Favorite, ["user_id", "post_id", "created_at"], ((uid, pid, now) for uid, pid in favorites))
+
+    blocks = {(rng.choice(user_ids), rng.choice(user_ids)) for _ in range(opts.blocks)}
+    loader.load(BlockedUser, ["user_id", "blocked_user_id", "timestamp"], (
+        (uid, other, now) for uid, other in blocks if uid != other
+    ))
+
+    # Messages, streamed, with the conversations read model aggregated on the way
+    pairs = set()
+    while len(pairs) < min(opts.conversations, len(user_ids) * (len(user_ids) - 1) // 2):
+        a = rng.choice(user_ids)
+        b = rng.choice(user_ids)  # mostly random; conversation skew comes from the pareto pick below
+        if a != b:
+            pairs.add((min(a, b), max(a, b)))
+    pairs = sorted(pairs)
+    first_message = loader.next_id(Message.message_id)
+    unread_after = first_message + int(opts.messages * 0.97)  # the newest 3% stay unread
+    span = timedelta(days=180)
+    convs = {}  # pair -> [last_id, last_sender, last_text, last_at, unread_a, unread_b, read_a, read_b]
+
+    def message_rows():
+        for i in range(opts.messages):
+            mid = first_message + i
+            a, b = pairs[min(int(rng.paretovariate(1.2)) - 1, len(pairs) - 1) if rng.random() < 0.5 else rng.randrange(len(pairs))]
+            sender, recipient = (a, b) if rng.random() < 0.5 else (b, a)
+            text = sentence(rng, 1, 20)
+            sent_at = now - span + span * (i / max(opts.messages, 1))
+            read = mid < unread_after
+            c = convs.setdefault((a, b), [None, None, None, None, 0, 0, None, None])
+            c[0:4] = [mid, sender, text, sent_at]
+            recipient_slot = 0 if recipient == a else 1
+            if read:
+                c[6 + recipient_slot] = mid
+            else:
+                c[4 + recipient_slot] += 1
+            yield mid, sender, recipient, text, sent_at, sent_at, read
+    loader.load(Message, ["message_id", "sender_id", "recipient_id", "text", "sent_at", "timestamp", "read"], message_rows())
+
+    loader.load(Conversation, ["user_a_id", "user_b_id", "last_message_id", "last_sender_id", "last_message_text",
+                               "last_message_at", "unread_a", "unread_b", "pinned_a", "pinned_b",
+                               "last_read_id_a", "last_read_id_b"], (
+        (a, b, c[0], c[1], c[2], c[3], c[4], c[5], False, False, c[6], c[7]) for (a, b), c in convs.items()
+    ))
+
+    loader.fix_sequences(
+        School.school_id, Chapter.chapter_id, User.user_id, Post.post_id, PostImage.image_id,
+        Comment.comment_id, BlockedUser.block_id, Message.message_id, Conversation.conversation_id,
+    )
+    fixed = unread_counts.reconcile()
+    print(f"✅ users.unread_message_count set for {fixed:,} users")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--schools", type=int)
+    parser.add_argument("--chapters-per-school", type=int, default=8)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--posts", type=int)
+    parser.add_argument("--comments", type=int)
+    parser.add_argument("--favorites", type=int)
+    parser.add_argument("--conversations", type=int)
+    parser.add_argument("--messages", type=int)
+    parser.add_argument("--blocks", type=int)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--create-tables", action="store_true",
+                        help="db.create_all() first (SQLite scratch databases; Postgres should use `flask db upgrade`)")
+    opts = parser.parse_args()
+    for key, value in PRESETS[opts.preset].items():
+        if getattr(opts, key) is None:
+            setattr(opts, key, value)
+
+    app = create_app()
+    with app.app_context():
+        if opts.create_tables:
+            db.create_all()
+        if db.engine.dialect.name == "sqlite":
+            search.ensure_sqlite_fts()  # triggers index rows as they load
+        print(f"🔧 Loading synthetic data into {db.engine.url.render_as_string(hide_password=True)}…")
+        started = time.perf_counter()
+        generate(opts)
+        print(f"🎉 Done in {time.perf_counter() - started:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
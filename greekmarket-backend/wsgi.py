@@ -0,0 +1,13 @@
+# wsgi.py
+"""
+Production entry point:  gunicorn -c gunicorn.conf.py wsgi:app
+(run.py is the local development server.)
+"""
+import logging
+
+from app import create_app
+
+# app.sql request stats and app warnings go to stderr next to gunicorn's logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(process)d] %(levelname)s %(name)s: %(message)s")
+
+app = create_app()
@@ -31,7 +31,13 @@ function resolveQueue(error, token = null) {
 
 // Response interceptor: refresh once on 401, then retry original request
 API.interceptors.response.use(
-  (res) => res,
+  (res) => {
+    // Endpoints that change school/chapter membership return a token with updated claims
+    if (res?.data?.access_token) {
+      localStorage.setItem("token", res.data.access_token);
+    }
+    return res;
+  },
   async (error) => {
     const original = error?.config;
     const status = error?.response?.status;